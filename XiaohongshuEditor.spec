@@ -6,7 +6,7 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[('E:\\wayForward\\projects\\RedBookCards\\resources', 'resources'), ('E:\\wayForward\\projects\\RedBookCards\\src', 'src')],
-    hiddenimports=['PySide6.QtCore', 'PySide6.QtGui', 'PySide6.QtWidgets', 'PySide6.QtWebEngineCore', 'PySide6.QtWebEngineWidgets', 'markdown', 'markdown.extensions', 'markdown.extensions.fenced_code', 'markdown.extensions.tables', 'markdown.extensions.nl2br', 'markdown.extensions.attr_list', 'markdown.extensions.def_list', 'markdown.extensions.footnotes', 'markdown.extensions.toc', 'markdown.extensions.sane_lists', 'markdown.extensions.smarty', 'bs4'],
+    hiddenimports=['PySide6.QtCore', 'PySide6.QtGui', 'PySide6.QtWidgets', 'PySide6.QtWebEngineCore', 'PySide6.QtWebEngineWidgets', 'markdown', 'markdown.extensions', 'markdown.extensions.fenced_code', 'markdown.extensions.tables', 'markdown.extensions.nl2br', 'markdown.extensions.attr_list', 'markdown.extensions.def_list', 'markdown.extensions.footnotes', 'markdown.extensions.toc', 'markdown.extensions.sane_lists', 'markdown.extensions.smarty', 'bs4', 'pypdf'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
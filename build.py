@@ -256,6 +256,7 @@ class AppBuilder:
             "markdown.extensions.sane_lists",
             "markdown.extensions.smarty",
             "bs4",  # beautifulsoup4
+            "lxml.etree",  # bs4 的 lxml 解析器
         ]
         
         for imp in hidden_imports:
@@ -42,6 +42,8 @@ a = Analysis(
         # 其他依赖
         'beautifulsoup4',
         'bs4',
+        'lxml.etree',
+        'pypdf',  # PDF逐页导出后合并（未安装时整体打印）
         'colorsys',
         'uuid',
     ],
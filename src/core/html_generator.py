@@ -2,9 +2,119 @@
 # src/core/html_generator.py
 # ============================================
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 from src.utils.style_manager import StyleManager
 
+# 页面脚本与主题无关，模块加载时生成一次
+_PAGE_JS = """
+        // 页面加载完成后的处理
+        document.addEventListener('DOMContentLoaded', function() {
+            // 添加淡入动画
+            const content = document.getElementById('content');
+            if (content) {
+                content.style.opacity = '0';
+                content.style.transition = 'opacity 0.6s cubic-bezier(0.4, 0, 0.2, 1)';
+                setTimeout(() => {
+                    content.style.opacity = '1';
+                }, 100);
+            }
+            
+            // 图片延迟加载和动画
+            const images = document.querySelectorAll('img');
+            images.forEach((img, index) => {
+                img.loading = 'lazy';
+                img.style.opacity = '0';
+                img.style.transform = 'translateY(20px)';
+                img.style.transition = 'opacity 0.6s ease, transform 0.6s ease';
+                
+                // 图片加载完成后显示
+                if (img.complete) {
+                    setTimeout(() => {
+                        img.style.opacity = '1';
+                        img.style.transform = 'translateY(0)';
+                    }, 100 * (index + 1));
+                } else {
+                    img.addEventListener('load', () => {
+                        setTimeout(() => {
+                            img.style.opacity = '1';
+                            img.style.transform = 'translateY(0)';
+                        }, 100);
+                    });
+                }
+            });
+            
+            // 代码块增强
+            const codeBlocks = document.querySelectorAll('pre');
+            codeBlocks.forEach(block => {
+                // 添加语言标识
+                const code = block.querySelector('code');
+                if (code && code.className) {
+                    const lang = code.className.replace('language-', '');
+                    if (lang) {
+                        block.setAttribute('data-language', lang.toUpperCase());
+                    }
+                }
+            });
+            
+            // 表格增强
+            const tables = document.querySelectorAll('table');
+            tables.forEach(table => {
+                // 添加响应式包装
+                const wrapper = document.createElement('div');
+                wrapper.style.overflowX = 'auto';
+                wrapper.style.marginBottom = '20px';
+                table.parentNode.insertBefore(wrapper, table);
+                wrapper.appendChild(table);
+            });
+            
+            // 确保内容不超出
+            function ensureContentFit() {
+                const card = document.querySelector('.card');
+                const content = document.querySelector('.content');
+                if (card && content) {
+                    content.style.maxHeight = '100%';
+                    content.style.overflow = 'hidden';
+                }
+            }
+            
+            ensureContentFit();
+            window.addEventListener('resize', ensureContentFit);
+        });
+        
+        // 禁用所有滚动
+        window.addEventListener('scroll', function(e) {
+            e.preventDefault();
+            window.scrollTo(0, 0);
+        }, { passive: false });
+        
+        window.addEventListener('wheel', function(e) {
+            e.preventDefault();
+        }, { passive: false });
+        
+        window.addEventListener('touchmove', function(e) {
+            e.preventDefault();
+        }, { passive: false });
+        """
+
+# 多页合并打印时：取消 body 的固定高度，每张卡片单独占一页
+_PRINT_DOCUMENT_CSS = """
+    <style>
+        html, body {
+            height: auto !important;
+            overflow: visible !important;
+        }
+        
+        .container {
+            break-after: page;
+            page-break-after: always;
+        }
+        
+        .container:last-child {
+            break-after: auto;
+            page-break-after: auto;
+        }
+    </style>"""
+
 class HTMLGenerator:
     def __init__(self, font_size: int = 18, page_size: str = "medium", theme: str = "xiaohongshu"):
         self.resource_path = Path(__file__).parent.parent / "resources"
@@ -24,6 +134,10 @@ class HTMLGenerator:
         self.style_manager = StyleManager(theme)
         self.current_theme = theme
         
+        # 页面外壳缓存
+        self._head_key = None
+        self._head_html = ""
+        
     def set_page_size(self, size: str):
         """设置页面尺寸"""
         if size in self.page_sizes:
@@ -40,7 +154,8 @@ class HTMLGenerator:
         """设置基础字体大小"""
         self.base_font_size = size
         
-    def generate(self, content: str, page_num: int = 0, total_pages: int = 0) -> str:
+    def generate(self, content: str, page_num: int = 0, total_pages: int = 0,
+                 for_print: bool = False) -> str:
         """
         生成完整的 HTML 页面
         
@@ -48,16 +163,34 @@ class HTMLGenerator:
             content: HTML内容
             page_num: 当前页码（0表示不显示）
             total_pages: 总页数
+            for_print: 用于打印/导出PDF时不加入淡入动画脚本，页面加载完即可直接打印
         """
-        # 生成主题CSS
-        theme_css = self.style_manager.generate_css(self.current_theme, self.base_font_size)
+        # 页面外壳（主题CSS + 页面CSS）只在主题/字号/尺寸变化时重新生成
+        head = self._get_page_head()
+        script = "" if for_print else f"\n    <script>{_PAGE_JS}</script>"
         
-        # 生成页面特定CSS
-        page_css = self.get_page_css()
-        
-        # 获取JavaScript
-        js = self.get_js()
+        return f"""{head}{self._page_card(content, page_num, total_pages)}{script}
+</body>
+</html>
+"""
+    
+    def generate_print_document(self, pages: List[str]) -> str:
+        """
+        将多页内容合并为一个用于打印的 HTML 文档
         
+        每页使用与 generate 相同的卡片外壳和页码，打印时每张卡片占一页
+        """
+        total_pages = len(pages)
+        cards = "".join(self._page_card(page, index, total_pages)
+                        for index, page in enumerate(pages, start=1))
+        return f"""{self._get_page_head()}{_PRINT_DOCUMENT_CSS}{cards}
+</body>
+</html>
+"""
+    
+    @staticmethod
+    def _page_card(content: str, page_num: int, total_pages: int) -> str:
+        """生成单页卡片（内容 + 页码信息）"""
         # 生成页码信息（如果需要）
         page_info = ""
         if page_num > 0 and total_pages > 1:
@@ -69,7 +202,28 @@ class HTMLGenerator:
             </div>
             """
         
-        html = f"""
+        return f"""
+    <div class="container">
+        <div class="card">
+            <div class="content" id="content">
+                {content}
+            </div>
+            {page_info}
+        </div>
+    </div>"""
+    
+    def _get_page_head(self) -> str:
+        """获取页面外壳中内容之前的部分（按主题、字号和尺寸缓存）"""
+        key = (self.current_theme, self.style_manager.current_theme,
+               self.base_font_size, self.page_width, self.page_height)
+        if key != self._head_key:
+            # 生成主题CSS（完整样式，所有页面共用同一个外壳）
+            theme_css = self.style_manager.generate_css(self.current_theme, self.base_font_size)
+            
+            # 生成页面特定CSS
+            page_css = self.get_page_css()
+            
+            self._head_html = f"""
 <!DOCTYPE html>
 <html lang="zh-CN">
 <head>
@@ -81,20 +235,9 @@ class HTMLGenerator:
         {page_css}
     </style>
 </head>
-<body>
-    <div class="container">
-        <div class="card">
-            <div class="content" id="content">
-                {content}
-            </div>
-            {page_info}
-        </div>
-    </div>
-    <script>{js}</script>
-</body>
-</html>
-"""
-        return html
+<body>"""
+            self._head_key = key
+        return self._head_html
     
     def get_page_css(self) -> str:
         """获取页面布局CSS"""
@@ -251,92 +394,4 @@ class HTMLGenerator:
     
     def get_js(self) -> str:
         """获取JavaScript代码"""
-        return """
-        // 页面加载完成后的处理
-        document.addEventListener('DOMContentLoaded', function() {
-            // 添加淡入动画
-            const content = document.getElementById('content');
-            if (content) {
-                content.style.opacity = '0';
-                content.style.transition = 'opacity 0.6s cubic-bezier(0.4, 0, 0.2, 1)';
-                setTimeout(() => {
-                    content.style.opacity = '1';
-                }, 100);
-            }
-            
-            // 图片延迟加载和动画
-            const images = document.querySelectorAll('img');
-            images.forEach((img, index) => {
-                img.loading = 'lazy';
-                img.style.opacity = '0';
-                img.style.transform = 'translateY(20px)';
-                img.style.transition = 'opacity 0.6s ease, transform 0.6s ease';
-                
-                // 图片加载完成后显示
-                if (img.complete) {
-                    setTimeout(() => {
-                        img.style.opacity = '1';
-                        img.style.transform = 'translateY(0)';
-                    }, 100 * (index + 1));
-                } else {
-                    img.addEventListener('load', () => {
-                        setTimeout(() => {
-                            img.style.opacity = '1';
-                            img.style.transform = 'translateY(0)';
-                        }, 100);
-                    });
-                }
-            });
-            
-            // 代码块增强
-            const codeBlocks = document.querySelectorAll('pre');
-            codeBlocks.forEach(block => {
-                // 添加语言标识
-                const code = block.querySelector('code');
-                if (code && code.className) {
-                    const lang = code.className.replace('language-', '');
-                    if (lang) {
-                        block.setAttribute('data-language', lang.toUpperCase());
-                    }
-                }
-            });
-            
-            // 表格增强
-            const tables = document.querySelectorAll('table');
-            tables.forEach(table => {
-                // 添加响应式包装
-                const wrapper = document.createElement('div');
-                wrapper.style.overflowX = 'auto';
-                wrapper.style.marginBottom = '20px';
-                table.parentNode.insertBefore(wrapper, table);
-                wrapper.appendChild(table);
-            });
-            
-            // 确保内容不超出
-            function ensureContentFit() {
-                const card = document.querySelector('.card');
-                const content = document.querySelector('.content');
-                if (card && content) {
-                    content.style.maxHeight = '100%';
-                    content.style.overflow = 'hidden';
-                }
-            }
-            
-            ensureContentFit();
-            window.addEventListener('resize', ensureContentFit);
-        });
-        
-        // 禁用所有滚动
-        window.addEventListener('scroll', function(e) {
-            e.preventDefault();
-            window.scrollTo(0, 0);
-        }, { passive: false });
-        
-        window.addEventListener('wheel', function(e) {
-            e.preventDefault();
-        }, { passive: false });
-        
-        window.addEventListener('touchmove', function(e) {
-            e.preventDefault();
-        }, { passive: false });
-        """
\ No newline at end of file
+        return _PAGE_JS
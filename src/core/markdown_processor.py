@@ -7,6 +7,18 @@ import re
 import os
 from pathlib import Path
 
+# 预编译的正则表达式（避免每次解析时重复查找/编译）
+_TASKLIST_ITEM_PREFIXES = ('- [ ] ', '- [x] ', '* [ ] ', '* [x] ')
+_TASKLIST_MARKER_RE = re.compile(r'<li><!--tasklist-(checked|unchecked)-->\s*')
+_PAGEBREAK_RE = re.compile(r'<!--\s*pagebreak\s*-->', re.IGNORECASE)
+_IMG_TAG_RE = re.compile(r'<img\b', re.IGNORECASE)
+# 完整的 <img> 标签（属性值中可含 >）；注释整体匹配以跳过其中的标签
+_IMG_OR_COMMENT_RE = re.compile(
+    r'<!--.*?-->|<img\b(?:[^>"\']|"[^"]*"|\'[^\']*\')*>',
+    re.IGNORECASE | re.DOTALL,
+)
+_WINDOWS_ABS_PATH_RE = re.compile(r'^[A-Za-z]:[\\/]')
+
 class TaskListExtension(markdown.Extension):
     """自定义任务列表扩展"""
     
@@ -26,8 +38,7 @@ class TaskListPreprocessor(markdown.preprocessors.Preprocessor):
             stripped = line.strip()
             
             # 识别任务列表项
-            if stripped.startswith('- [ ] ') or stripped.startswith('- [x] ') or \
-               stripped.startswith('* [ ] ') or stripped.startswith('* [x] '):
+            if stripped.startswith(_TASKLIST_ITEM_PREFIXES):
                 # 将任务列表标记转换为 HTML 注释，避免被 Markdown 再次处理
                 if stripped.startswith('- [x] ') or stripped.startswith('* [x] '):
                     new_line = line.replace('[x] ', '<!--tasklist-checked--> ', 1)
@@ -51,23 +62,16 @@ class TaskListPostprocessor(markdown.postprocessors.Postprocessor):
     
     def run(self, text):
         # 将任务列表标记转换为带有 checkbox 的 li
-        # 替换已选中的任务
-        text = re.sub(
-            r'<li><!--tasklist-checked-->\s*(.*?)</li>',
-            r'<li class="task-list-item"><input type="checkbox" class="task-list-checkbox" checked disabled> \1</li>',
-            text,
-            flags=re.DOTALL
-        )
+        # 已选中/未选中两种标记在一次扫描中同时替换
+        if '<!--tasklist-' not in text:
+            return text
         
-        # 替换未选中的任务
-        text = re.sub(
-            r'<li><!--tasklist-unchecked-->\s*(.*?)</li>',
-            r'<li class="task-list-item"><input type="checkbox" class="task-list-checkbox" disabled> \1</li>',
-            text,
-            flags=re.DOTALL
-        )
-        
-        return text
+        return _TASKLIST_MARKER_RE.sub(self._replace_marker, text)
+    
+    @staticmethod
+    def _replace_marker(match) -> str:
+        checked = ' checked' if match.group(1) == 'checked' else ''
+        return f'<li class="task-list-item"><input type="checkbox" class="task-list-checkbox"{checked} disabled> '
 
 class MarkdownProcessor:
     def __init__(self):
@@ -100,6 +104,13 @@ class MarkdownProcessor:
                 'permalink': True
             }
         }
+        
+        # 复用同一个 Markdown 实例：每次都重新构造会重复加载全部扩展，
+        # 是实时预览中最主要的开销。转换前调用 reset() 清除上一次的状态。
+        self.md = markdown.Markdown(
+            extensions=self.extensions,
+            extension_configs=self.extension_configs
+        )
     
     def parse(self, text: str) -> str:
         """解析 Markdown 文本为 HTML"""
@@ -108,11 +119,8 @@ class MarkdownProcessor:
             text = self._process_pagebreaks_before_markdown(text)
             
             # 2. 正常让 Markdown 解析（包括图片）
-            md = markdown.Markdown(
-                extensions=self.extensions,
-                extension_configs=self.extension_configs
-            )
-            html = md.convert(text)
+            self.md.reset()
+            html = self.md.convert(text)
             
             # 3. 处理本地图片路径
             html = self._fix_local_image_paths(html)
@@ -128,54 +136,67 @@ class MarkdownProcessor:
     
     def _fix_local_image_paths(self, html: str) -> str:
         """修复本地图片路径，确保能在 QWebEngineView 中显示（兼容任意盘符）"""
+        # 没有图片时无需处理
+        if not _IMG_TAG_RE.search(html):
+            return html
+        
+        # 只解析并改写 <img> 标签本身，不为整篇文档构建 DOM 树再重新序列化
+        return _IMG_OR_COMMENT_RE.sub(self._fix_image_tag, html)
+    
+    @staticmethod
+    def _fix_image_tag(match) -> str:
+        """修正单个 <img> 标签的路径与默认样式"""
+        tag_html = match.group(0)
+        if tag_html.startswith('<!--'):
+            return tag_html
+        
         from bs4 import BeautifulSoup
-        import re
-        soup = BeautifulSoup(html, 'html.parser')
-        for img in soup.find_all('img'):
-            src = img.get('src', '')
-            if not src:
-                continue
-            # 已是可用的 URL / data URI 直接跳过
-            if src.startswith(('http://', 'https://', 'data:', 'file:')):
-                img['data-protected'] = 'true'
-                if not img.get('style'):
-                    img['style'] = 'max-width: 100%; height: auto;'
-                continue
-            # Windows 绝对路径：任意盘符，如 E:\ 或 E:/ 开头
-            if re.match(r'^[A-Za-z]:[\\/]', src):
-                src = src.replace('\\', '/')
-                if not src.startswith('file:'):
-                    src = 'file:///' + src
-            else:
-                # 相对路径 -> 绝对路径
-                try:
-                    abs_path = os.path.abspath(src).replace('\\', '/')
-                    src = 'file:///' + abs_path
-                except Exception:
-                    pass
-            # 应用修正
-            img['src'] = src
-            # 默认样式
+        img = BeautifulSoup(tag_html, 'html.parser').img
+        if img is None:
+            return tag_html
+        src = img.get('src', '')
+        if not src:
+            return tag_html
+        # 已是可用的 URL / data URI 直接跳过
+        if src.startswith(('http://', 'https://', 'data:', 'file:')):
+            img['data-protected'] = 'true'
             if not img.get('style'):
                 img['style'] = 'max-width: 100%; height: auto;'
-            img['data-protected'] = 'true'
-        return str(soup)
+            return str(img)
+        # Windows 绝对路径：任意盘符，如 E:\ 或 E:/ 开头
+        if _WINDOWS_ABS_PATH_RE.match(src):
+            src = src.replace('\\', '/')
+            if not src.startswith('file:'):
+                src = 'file:///' + src
+        else:
+            # 相对路径 -> 绝对路径
+            try:
+                abs_path = os.path.abspath(src).replace('\\', '/')
+                src = 'file:///' + abs_path
+            except Exception:
+                pass
+        # 应用修正
+        img['src'] = src
+        # 默认样式
+        if not img.get('style'):
+            img['style'] = 'max-width: 100%; height: auto;'
+        img['data-protected'] = 'true'
+        return str(img)
     
     def _process_pagebreaks_before_markdown(self, text: str) -> str:
         """
         在 Markdown 解析之前处理分页标记
         直接将 <!-- pagebreak --> 替换为特殊的 HTML div
         """
-        # 匹配 HTML 注释形式的分页标记（支持大小写和空格变化）
-        pattern = r'<!--\s*pagebreak\s*-->'
+        # 快速判断：没有注释就不可能有分页标记
+        if '<!--' not in text:
+            return text
         
         # 直接替换为 HTML div（这个 div 不会被 Markdown 解析器改变）
         replacement = '\n\n<div class="pagebreak-marker" data-pagebreak="true"></div>\n\n'
         
-        # 执行替换
-        text = re.sub(pattern, replacement, text, flags=re.IGNORECASE)
-        
-        return text
+        # 匹配 HTML 注释形式的分页标记（支持大小写和空格变化）
+        return _PAGEBREAK_RE.sub(replacement, text)
     
     def _add_tasklist_styles(self, html: str) -> str:
         """为任务列表添加样式"""
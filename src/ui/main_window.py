@@ -1087,7 +1087,8 @@ class MainWindow(QMainWindow):
     def setup_connections(self):
         """设置信号连接"""
         self.editor.textChanged.connect(self.on_text_changed)
-        self.editor.scrollChanged.connect(self.preview.handle_scroll)
+        # 预览为分页卡片，不跟随编辑器滚动；不再连接 scrollChanged，
+        # 避免每次滚动都向预览派发一次空操作
         self.preview.pageChanged.connect(self.on_page_changed)
         self.theme_selector.currentIndexChanged.connect(self.on_theme_changed)
         
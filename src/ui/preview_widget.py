@@ -996,7 +996,11 @@ class PreviewWidget(QWidget):
         return size_config.get(self.current_size, "1080×1440")
     
     def handle_scroll(self, percentage: float):
-        """处理编辑器滚动同步（保留接口兼容性）"""
+        """
+        处理编辑器滚动同步（保留接口兼容性）
+        
+        预览按页显示，页面内部禁止滚动，因此不向 WebView 注入任何脚本。
+        """
         pass
     
     def show_error(self, message: str):
@@ -1,13 +1,14 @@
 # ============================================
 # src/utils/exporter.py
 # ============================================
-from PySide6.QtCore import QObject, Signal, QTimer, QEventLoop, QSize, Qt, QPoint, QRect
-from PySide6.QtGui import QImage, QPainter, QFont, QColor, QPageSize, QRegion
+from PySide6.QtCore import QObject, Signal, QTimer, QEventLoop, QSize, Qt, QPoint, QRect, QMarginsF
+from PySide6.QtGui import QImage, QPainter, QFont, QColor, QPageSize, QPageLayout, QRegion
 from PySide6.QtWebEngineWidgets import QWebEngineView
 from PySide6.QtPrintSupport import QPrinter
 from PySide6.QtWidgets import QWidget
 from pathlib import Path
 from typing import List, Optional
+from io import BytesIO
 import json
 import time
 
@@ -19,6 +20,10 @@ class ImageExporter(QObject):
     finished = Signal(bool, str)  # 是否成功，消息
     page_exported = Signal(int, str)  # 页码，文件路径
     
+    # 打印PDF的等待时间（毫秒）
+    PDF_LOAD_TIMEOUT = 5000    # 页面加载超时
+    PDF_PRINT_TIMEOUT = 10000  # 打印回调超时
+    
     def __init__(self, web_view: QWebEngineView):
         super().__init__()
         self.web_view = web_view
@@ -29,6 +34,7 @@ class ImageExporter(QObject):
         self.export_format = "PNG"
         self.quality = 100
         self._is_exporting = False
+        self._capture_buffer = None  # 导出过程中复用的图片缓冲区
         
     def export_pages(self, pages: List[str], output_folder: str, html_generator, 
                      format: str = "PNG", quality: int = 100) -> None:
@@ -53,10 +59,13 @@ class ImageExporter(QObject):
         # 确保输出文件夹存在
         self.output_folder.mkdir(parents=True, exist_ok=True)
         
-        # 确保WebView是固定尺寸
-        self.web_view.setFixedSize(1080, 1440)
+        # 确保WebView是固定尺寸（导出开始时设置一次，逐页捕获时不再调整，避免重复重排）
+        self.web_view.setFixedSize(html_generator.page_width, html_generator.page_height)
         self.web_view.setZoomFactor(1.0)  # 重置缩放
         
+        # 预分配捕获缓冲区，所有页面复用同一块内存
+        self._capture_buffer = QImage(html_generator.page_width, html_generator.page_height, QImage.Format_RGB32)
+        
         # 开始导出第一页
         self._export_next_page()
     
@@ -68,6 +77,7 @@ class ImageExporter(QObject):
         if self.current_export_index >= len(self.pages_to_export):
             # 导出完成
             self._is_exporting = False
+            self._capture_buffer = None
             self.finished.emit(True, f"成功导出 {len(self.pages_to_export)} 张图片")
             return
         
@@ -111,8 +121,8 @@ class ImageExporter(QObject):
             target_width = self.html_generator.page_width
             target_height = self.html_generator.page_height
             
-            # 创建目标图片
-            image = QImage(target_width, target_height, QImage.Format_ARGB32)
+            # 复用导出开始时分配的缓冲区（卡片不透明，使用 RGB32 省去逐像素的 alpha 合成）
+            image = self._capture_buffer
             image.fill(Qt.white)
             
             # 创建painter
@@ -121,9 +131,6 @@ class ImageExporter(QObject):
             painter.setRenderHint(QPainter.RenderHint.TextAntialiasing, True)
             painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform, True)
             
-            # 确保WebView是正确的尺寸
-            self.web_view.resize(target_width, target_height)
-            
             # 渲染WebView到图片
             # 使用固定的源矩形来确保只捕获卡片区域
             source_rect = QRect(0, 0, target_width, target_height)
@@ -153,10 +160,12 @@ class ImageExporter(QObject):
                 QTimer.singleShot(100, self._export_next_page)
             else:
                 self._is_exporting = False
+                self._capture_buffer = None
                 self.finished.emit(False, f"保存图片失败: {output_path}")
                 
         except Exception as e:
             self._is_exporting = False
+            self._capture_buffer = None
             self.finished.emit(False, f"导出页面 {page_num} 时出错: {str(e)}")
     
     def _add_export_watermark(self, painter: QPainter, page_num: int):
@@ -177,65 +186,103 @@ class ImageExporter(QObject):
         """
         导出为PDF文件（所有页面合并为一个PDF）
         
+        安装了 pypdf 时逐页渲染再合并，Chromium 每次只需排版一张卡片；
+        否则退回到合并为单个HTML后整体打印的方式。两种方式的页面尺寸、卡片外壳和页码一致。
+        
         Args:
             pages: HTML页面内容列表
             output_file: 输出PDF文件路径
             html_generator: HTML生成器实例
         """
         try:
-            # 创建PDF打印机
-            printer = QPrinter(QPrinter.PrinterMode.HighResolution)
-            printer.setOutputFormat(QPrinter.OutputFormat.PdfFormat)
-            printer.setOutputFileName(output_file)
-            
-            # 设置页面大小为小红书卡片比例
-            # 注意：PDF使用点(point)作为单位，1点 = 1/72英寸
-            # 1080px × 1440px 在 96 DPI 下约等于 810pt × 1080pt
-            page_size = QPageSize(QSize(810, 1080), QPageSize.Unit.Point)
-            printer.setPageSize(page_size)
-            printer.setPageMargins(0, 0, 0, 0, QPrinter.Unit.Millimeter)
-            
-            # 合并所有页面内容
-            combined_html = self._combine_pages_for_pdf(pages, html_generator)
-            
-            # 加载合并后的HTML
-            self.web_view.setHtml(combined_html, "file:///")
-            
-            # 等待加载完成后打印
-            loop = QEventLoop()
-            
-            def on_load_finished():
-                self.web_view.page().print(printer, lambda success: loop.quit())
-            
-            QTimer.singleShot(1000, on_load_finished)
-            loop.exec()
+            layout = self._pdf_page_layout(html_generator)
+            try:
+                from pypdf import PdfWriter
+            except ImportError:
+                self._export_combined_pdf(pages, output_file, html_generator, layout)
+            else:
+                writer = PdfWriter()
+                total = len(pages)
+                for index, page in enumerate(pages, start=1):
+                    full_html = html_generator.generate(page, page_num=index, total_pages=total, for_print=True)
+                    pdf_data = self._print_page_to_pdf(full_html, layout)
+                    if not pdf_data:
+                        raise RuntimeError(f"第 {index} 页渲染失败")
+                    writer.append(BytesIO(pdf_data))
+                
+                with open(output_file, 'wb') as f:
+                    writer.write(f)
             
             self.finished.emit(True, f"PDF导出成功: {output_file}")
             
         except Exception as e:
             self.finished.emit(False, f"PDF导出失败: {str(e)}")
     
-    def _combine_pages_for_pdf(self, pages: List[str], html_generator) -> str:
-        """合并多个页面为PDF格式"""
-        combined_content = ""
-        
-        for i, page in enumerate(pages, 1):
-            if i > 1:
-                # 添加分页符
-                combined_content += '<div style="page-break-before: always;"></div>'
-            
-            # 添加页面内容，包装在固定尺寸的容器中
-            combined_content += f'''
-            <div style="width: 1080px; height: 1440px; position: relative; overflow: hidden;">
-                {page}
-            </div>
-            '''
-        
-        # 生成完整HTML
-        return html_generator.generate(combined_content)
+    @staticmethod
+    def _pdf_page_layout(html_generator) -> QPageLayout:
+        """PDF页面布局：与卡片尺寸一致，无边距"""
+        # px 在 96 DPI 下换算为 pt（1pt = 1/72英寸），如 1080px × 1440px 对应 810pt × 1080pt
+        page_size = QPageSize(
+            QSize(html_generator.page_width * 3 // 4, html_generator.page_height * 3 // 4),
+            QPageSize.Unit.Point
+        )
+        return QPageLayout(page_size, QPageLayout.Orientation.Portrait, QMarginsF(0, 0, 0, 0))
+    
+    def _load_html(self, full_html: str):
+        """加载HTML并等待加载完成（超时保护，避免事件循环卡死）"""
+        load_loop = QEventLoop()
+        self.web_view.loadFinished.connect(load_loop.quit)
+        self.web_view.setHtml(full_html, "file:///")
+        self._run_event_loop(load_loop, self.PDF_LOAD_TIMEOUT)
+        self.web_view.loadFinished.disconnect(load_loop.quit)
+    
+    def _print_page_to_pdf(self, full_html: str, layout: QPageLayout) -> bytes:
+        """加载单页HTML并通过 Chromium 打印为PDF数据"""
+        # 打印用的页面不含淡入动画脚本，加载完成即可打印
+        self._load_html(full_html)
+        
+        # 打印为PDF字节流
+        pdf_loop = QEventLoop()
+        result = {}
+        
+        def on_pdf_ready(data):
+            result['data'] = bytes(data)
+            pdf_loop.quit()
+        
+        self.web_view.page().printToPdf(on_pdf_ready, layout)
+        self._run_event_loop(pdf_loop, self.PDF_PRINT_TIMEOUT)
+        return result.get('data', b'')
+    
+    @staticmethod
+    def _run_event_loop(loop: QEventLoop, timeout: int):
+        """运行事件循环，最多等待 timeout 毫秒"""
+        timer = QTimer()
+        timer.setSingleShot(True)
+        timer.timeout.connect(loop.quit)
+        timer.start(timeout)
+        loop.exec()
+        timer.stop()
+    
+    def _export_combined_pdf(self, pages: List[str], output_file: str, html_generator,
+                             layout: QPageLayout):
+        """将所有页面合并为一个HTML后整体打印为PDF"""
+        # 创建PDF打印机（页面尺寸与逐页打印时相同）
+        printer = QPrinter(QPrinter.PrinterMode.HighResolution)
+        printer.setOutputFormat(QPrinter.OutputFormat.PdfFormat)
+        printer.setOutputFileName(output_file)
+        printer.setPageLayout(layout)
+        
+        # 合并所有页面内容（每页使用相同的卡片外壳和页码），加载完成后打印
+        self._load_html(html_generator.generate_print_document(pages))
+        
+        # 整份文档的打印耗时随页数增长，等待打印回调而不设超时
+        print_loop = QEventLoop()
+        self.web_view.page().print(printer, lambda success: print_loop.quit())
+        print_loop.exec()
     
     def cancel_export(self):
         """取消导出"""
         self._is_exporting = False
         self.pages_to_export = []
+        self._capture_buffer = None
         self.finished.emit(False, "导出已取消")
\ No newline at end of file
@@ -2,14 +2,85 @@
 # src/utils/paginator.py - 优化完整版
 # ============================================
 from typing import List, Tuple, Optional, Dict
+from collections import OrderedDict
 from dataclasses import dataclass
-from bs4 import BeautifulSoup, NavigableString, Tag, Comment
+from functools import lru_cache
+from itertools import accumulate
+from bisect import bisect_right
+from bs4 import BeautifulSoup, NavigableString, Tag, Comment, CData
 import re
+import sys
+
+# 优先使用 C 实现的 lxml 解析器，未安装时退回纯 Python 的 html.parser
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+
+@lru_cache(maxsize=4096)
+def _estimate_text_lines(text: str, content_width: int, char_width: int, char_width_en: int) -> int:
+    """估算文本在给定内容宽度下的行数（中英文混排，按 文本+宽度 缓存）"""
+    # 非ASCII字符数由 C 层的编码计算得出，避免逐字符的 Python 循环
+    if text.isascii():
+        wide_chars = 0
+    else:
+        wide_chars = len(text) - len(text.encode('ascii', 'ignore'))
+    # 纯整数运算：宽度均为非负整数，整除结果 +1 即为行数（至少为 1）
+    total_width = len(text) * char_width_en + wide_chars * (char_width - char_width_en)
+    return total_width // content_width + 1
+
+
+# 段落切分点（空白或标点）
+_SPLIT_POINT_RE = re.compile(r'[\s，。；；、,.!?)]')
+
+# 顶层块切分用的标签扫描（注释整体跳过）
+_TAG_TOKEN_RE = re.compile(r'<!--.*?-->|<(/?)([a-zA-Z][a-zA-Z0-9]*)\b[^>]*?(/?)>', re.S)
+_VOID_TAGS = frozenset((
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+    'link', 'meta', 'param', 'source', 'track', 'wbr',
+))
+
+
+def _top_level_source_slices(html: str) -> Optional[List[Tuple[str, int, int]]]:
+    """
+    扫描原始HTML，返回每个顶层元素的 (标签名, 起始偏移, 结束偏移)
+
+    标签嵌套不配对（依赖隐式闭合等）时返回 None
+    """
+    slices = []
+    stack = []
+    start = 0
+    for match in _TAG_TOKEN_RE.finditer(html):
+        name = match.group(2)
+        if name is None:
+            continue
+        name = name.lower()
+        if match.group(1):
+            if not stack or stack[-1] != name:
+                return None
+            stack.pop()
+            if not stack:
+                slices.append((name, start, match.end()))
+        elif match.group(3) or name in _VOID_TAGS:
+            if not stack:
+                slices.append((name, match.start(), match.end()))
+        else:
+            if not stack:
+                start = match.start()
+            stack.append(name)
+    return None if stack else slices
+
+
+# Python 3.10+ 的 dataclass 支持 __slots__，元素数量多时可明显减少内存占用
+_DATACLASS_OPTIONS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class PageElement:
     """页面元素"""
-    type: str  # 'heading', 'paragraph', 'list', 'code', 'blockquote', 'table', 'hr', 'text', 'pagebreak'
+    type: str  # 'heading', 'paragraph', 'list', 'code', 'blockquote', 'table', 'hr', 'text', 'pagebreak', 'style'
     content: str  # HTML内容
     text: str  # 纯文本内容（用于计算高度）
     level: int = 0  # 标题级别或嵌套深度
@@ -48,21 +119,24 @@ class SmartPaginator:
             "height": 960,
             "padding_top": 35,
             "padding_bottom": 50,
-            "padding_sides": 30
+            "padding_sides": 30,
+            "image_height": 300  # 图片估算高度
         },
         "medium": {
             "width": 1024,
             "height": 1365,
             "padding_top": 50,
             "padding_bottom": 70,
-            "padding_sides": 40
+            "padding_sides": 40,
+            "image_height": 300  # 图片估算高度
         },
         "large": {
             "width": 1440,
             "height": 1920,
             "padding_top": 55,
             "padding_bottom": 90,
-            "padding_sides": 50
+            "padding_sides": 50,
+            "image_height": 300  # 图片估算高度
         }
     }
 
@@ -71,6 +145,17 @@ class SmartPaginator:
     MIN_WIDOW_LINES = 2  # 寡行控制
     HEADING_KEEP_WITH = 120  # 标题后至少保留的内容高度
 
+    # 标签分类
+    HEADING_TAGS = frozenset(('h1', 'h2', 'h3', 'h4', 'h5', 'h6'))
+    CONTAINER_TAGS = frozenset(('div', 'section', 'article', 'main'))
+    # 块级标签：html.parser 不会自动闭合 <p>，后续块级兄弟可能被解析为段落的子节点
+    BLOCK_TAGS = HEADING_TAGS | CONTAINER_TAGS | frozenset((
+        'p', 'ul', 'ol', 'pre', 'blockquote', 'table', 'hr', 'dl', 'figure',
+        'header', 'footer', 'nav', 'aside', 'details'))
+
+    # 页面元素缓存容量（需覆盖一篇长文的全部页面，保证优化/调试阶段都能命中）
+    PAGE_CACHE_SIZE = 256
+
     # 字符宽度估算（像素）
     CHAR_WIDTH = 15  # 中文字符平均宽度（稍微调小）
     CHAR_WIDTH_EN = 8  # 英文字符平均宽度
@@ -80,6 +165,29 @@ class SmartPaginator:
         self.elements: List[PageElement] = []
         self.set_page_size(page_size)
         self.forced_break_pages = set()
+        # 当前解析中分页标记节点及其祖先节点的 id（仅在解析期间有效）
+        self._pagebreak_ids = set()
+        self._pagebreak_ancestor_ids = set()
+        self._node_sources: Dict[int, str] = {}  # 顶层节点 id -> 原始HTML片段
+        # 页面HTML -> (元素列表, 总高度)（LRU，跨多次分页/优化/调试调用复用）
+        self._page_layouts: 'OrderedDict[str, Tuple[List[PageElement], int]]' = OrderedDict()
+
+        # 标签 -> 处理方法
+        self._tag_handlers = {tag: self._parse_heading for tag in self.HEADING_TAGS}
+        self._tag_handlers.update({
+            'p': self._parse_paragraph,
+            'img': self._parse_image,
+            'ul': self._parse_list,
+            'ol': self._parse_list,
+            'pre': self._parse_code,
+            'blockquote': self._parse_blockquote,
+            'table': self._parse_table,
+            'hr': self._parse_hr,
+            'style': self._parse_style,
+            'script': self._parse_style,
+        })
+        # 容器标签没有处理方法，直接展开子节点
+        self._tag_handlers.update({tag: None for tag in self.CONTAINER_TAGS})
 
     def set_page_size(self, size: str):
         """设置页面尺寸"""
@@ -92,8 +200,21 @@ class SmartPaginator:
         self.padding_top = cfg["padding_top"]
         self.padding_bottom = cfg["padding_bottom"]
         self.padding_sides = cfg["padding_sides"]
+        self.image_height = cfg["image_height"]
         self.content_height = self.page_height - self.padding_top - self.padding_bottom
         self.content_width = self.page_width - self.padding_sides * 2
+        # 每行可容纳的（中文）字符数只随页面尺寸变化，在此一次算好
+        self._chars_per_line = self.content_width // self.CHAR_WIDTH
+        # 引用块内容宽度更窄
+        self._blockquote_chars_per_line = max(1, (self.content_width - 60) // self.CHAR_WIDTH)
+        # 合并过短页的阈值（像素）：低于该高度的页尝试与下一页合并，合并后不超过上限（留5%余量）
+        merge_threshold = 0.3 if size == "small" else 0.35
+        self._merge_threshold_px = self.content_height * merge_threshold
+        self._merge_limit_px = self.content_height * 0.95
+        # 元素高度依赖页面尺寸，切换尺寸后已记录的元素列表失效
+        self._page_layouts = OrderedDict()
+        self._last_html: Optional[str] = None
+        self._last_elements: List[PageElement] = []
 
     def get_page_info(self) -> Dict[str, int]:
         """获取当前页面信息"""
@@ -120,90 +241,169 @@ class SmartPaginator:
         # 重置状态
         self.forced_break_pages = set()
 
-        # 1. 解析HTML为元素列表
-        elements = self.parse_html_to_elements(html_content)
+        # 1. 解析HTML为元素列表（输入与上次相同时直接复用上次的解析结果）
+        if html_content == self._last_html:
+            elements = self._last_elements
+        else:
+            elements = self.parse_html_to_elements(html_content)
+            self._last_html = html_content
+            self._last_elements = elements
 
         if not elements:
             return [html_content] if html_content else []
 
+        # 循环只读取高度/类型/可分割标记，预先拆成平行列表，避免逐个访问元素属性
+        n = len(elements)
+        heights = [e.height for e in elements]
+        types = [e.type for e in elements]
+        can_breaks = [e.can_break for e in elements]
+        contents = [e.content for e in elements]
+
+        # 循环内频繁使用的属性/方法提前取到局部变量
+        content_height = self.content_height
+        build_page = self._build_page
+        forced_break_pages = self.forced_break_pages
+
+        # 大多数文档没有强制分页标记（C 层的列表查找即可判断）
+        has_breaks = 'pagebreak' in types
+
+        # 快速路径：没有强制分页且总高度一页放得下，跳过分页循环；
+        # 页面仍由元素HTML拼接而成，与多页时的输出格式一致
+        total_height = sum(heights)
+        if not has_breaks and total_height <= content_height:
+            return [build_page(list(elements), contents, total_height)]
+
         # 2. 执行分页
         pages = []
+        page_heights = []  # 与 pages 一一对应的页面总高度，供合并短页时直接使用
         current_page_elements = []
+        current_page_contents = []  # 与 current_page_elements 同步的HTML片段，出页时直接拼接
         current_height = 0
 
+        # 高度前缀和：cum[k] 为前 k 个元素的高度之和，用于二分查找一次放入多个元素
+        cum = [0, *accumulate(heights)]
+        # 分页标记位置（末尾哨兵 n），next_break 始终指向 i 之后的第一个标记；
+        # 没有标记时只有哨兵，循环中也不会进入强制分页分支
+        if has_breaks:
+            break_positions = [k for k, t in enumerate(types) if t == 'pagebreak']
+            break_positions.append(n)
+        else:
+            break_positions = [n]
+        next_break = 0
+
         i = 0
-        while i < len(elements):
-            element = elements[i]
+        while i < n:
+            element_type = types[i]
 
             # 处理强制分页标记
-            if element.type == 'pagebreak':
+            if element_type == 'pagebreak':
                 if current_page_elements:
-                    pages.append(self._elements_to_html(current_page_elements))
+                    pages.append(build_page(current_page_elements, current_page_contents, current_height))
+                    page_heights.append(current_height)
                     current_page_elements = []
+                    current_page_contents = []
                     current_height = 0
-                    self.forced_break_pages.add(len(pages) - 1)
+                    forced_break_pages.add(len(pages) - 1)
                 else:
                     # 当前页为空，插入一个空页以表示强制分页
                     pages.append('')
-                    self.forced_break_pages.add(len(pages) - 1)
+                    page_heights.append(0)
+                    forced_break_pages.add(len(pages) - 1)
+                next_break += 1
                 i += 1
                 continue
 
-            # 如果当前元素能放下
-            if current_height + element.height <= self.content_height:
-                current_page_elements.append(element)
-                current_height += element.height
-                i += 1
+            # 如果当前元素能放下：连同其后能放下的元素一起放入（不越过下一个分页标记）
+            if current_height + heights[i] <= content_height:
+                stop = break_positions[next_break]
+                limit = cum[i] + content_height - current_height
+                j = bisect_right(cum, limit, i + 1, stop + 1) - 1
+                current_page_elements.extend(elements[i:j])
+                current_page_contents.extend(contents[i:j])
+                current_height += cum[j] - cum[i]
+                i = j
                 continue
 
-            # 放不下，尝试分割（仅对段落支持）
-            if element.can_break and element.type in ('paragraph', 'paragraph_with_images', 'text', 'blockquote', 'code'):
-                # 可用高度
-                available = self.content_height - current_height
-
-                # 仅对“纯文本段落”尝试分割；图文段落/代码/引用通常不分割
-                if element.type == 'paragraph' and element.text:
-                    split_result = self._try_split_paragraph(element, available)
-                    if split_result:
-                        part1, part2 = split_result
-                        current_page_elements.append(part1)
-                        pages.append(self._elements_to_html(current_page_elements))
-                        current_page_elements = [part2]
-                        current_height = part2.height
-                        i += 1
-                        continue
+            # 放不下，尝试分割：仅对可分割的“纯文本段落”尝试；图文段落/代码/引用通常不分割
+            if element_type == 'paragraph' and can_breaks[i] and elements[i].text:
+                split_result = self._try_split_paragraph(elements[i], content_height - current_height)
+                if split_result:
+                    part1, part2 = split_result
+                    current_page_elements.append(part1)
+                    current_page_contents.append(part1.content)
+                    current_height += part1.height
+                    pages.append(build_page(current_page_elements, current_page_contents, current_height))
+                    page_heights.append(current_height)
+                    current_page_elements = [part2]
+                    current_page_contents = [part2.content]
+                    current_height = part2.height
+                    i += 1
+                    continue
 
             # 如果无法分割或分割失败，则换页
             if current_page_elements:
-                pages.append(self._elements_to_html(current_page_elements))
+                pages.append(build_page(current_page_elements, current_page_contents, current_height))
+                page_heights.append(current_height)
                 current_page_elements = []
+                current_page_contents = []
                 current_height = 0
                 # 不前进i，下一轮再尝试放element
                 continue
             else:
                 # 如果当前页为空也放不下，就强制放进去（避免死循环）
-                current_page_elements.append(element)
-                pages.append(self._elements_to_html(current_page_elements))
+                current_page_elements.append(elements[i])
+                current_page_contents.append(contents[i])
+                pages.append(build_page(current_page_elements, current_page_contents, heights[i]))
+                page_heights.append(heights[i])
                 current_page_elements = []
+                current_page_contents = []
                 current_height = 0
                 i += 1
 
         # 3. 收尾：最后一页
         if current_page_elements:
-            pages.append(self._elements_to_html(current_page_elements))
+            pages.append(build_page(current_page_elements, current_page_contents, current_height))
+            page_heights.append(current_height)
 
         # 4. 合并过短页（避免出现很多内容特别少的页面）
-        pages = self.optimize_pages(pages)
+        pages = self.optimize_pages(pages, page_heights)
 
         return pages
 
+    def _build_page(self, elements: List[PageElement], contents: List[str], total_height: int) -> str:
+        """
+        由分页循环累积的HTML片段生成一页，并记录该页的元素列表供后续优化/调试复用
+
+        传入的列表归该页所有，调用方出页后需换用新列表
+        """
+        page = '\n'.join(contents)
+        self._remember_page_layout(page, elements, total_height)
+        return page
+
+    def _remember_page_layout(self, page: str, elements: List[PageElement], total_height: Optional[int] = None):
+        """记录页面的元素列表及总高度，超出容量时淘汰最久未使用的页面"""
+        if total_height is None:
+            total_height = sum(e.height for e in elements)
+        cache = self._page_layouts
+        cache[page] = (elements, total_height)
+        cache.move_to_end(page)
+        while len(cache) > self.PAGE_CACHE_SIZE:
+            cache.popitem(last=False)
+
+    def _get_page_layout(self, page: str) -> Tuple[List[PageElement], int]:
+        """获取页面的 (元素列表, 总高度)（优先使用已记录的结果，避免重新解析HTML）"""
+        layout = self._page_layouts.get(page)
+        if layout is None:
+            elements = self.parse_html_to_elements(page)
+            self._remember_page_layout(page, elements)
+            return self._page_layouts[page]
+        self._page_layouts.move_to_end(page)
+        return layout
+
     def _elements_to_html(self, elements: List[PageElement]) -> str:
         """将元素列表转换回HTML字符串"""
-        html_parts = []
-        for element in elements:
-            if element.type != 'pagebreak':
-                html_parts.append(element.content)
-        return '\n'.join(html_parts)
+        # str.join 会先把参数转成列表，直接传列表推导式比生成器表达式更快
+        return '\n'.join([e.content for e in elements if e.type != 'pagebreak'])
 
     def _try_split_paragraph(self, element: PageElement, available_height: int) -> Optional[Tuple[PageElement, PageElement]]:
         """
@@ -216,8 +416,9 @@ class SmartPaginator:
         Returns:
             分割后的两个元素，如果无法分割则返回None
         """
+        eh = self.ELEMENT_HEIGHTS
         # 如果剩余空间太小，不分割
-        if available_height < self.ELEMENT_HEIGHTS['p_base'] + 2 * self.ELEMENT_HEIGHTS['p_line']:
+        if available_height < eh['p_base'] + 2 * eh['p_line']:
             return None
 
         text = element.text
@@ -225,9 +426,9 @@ class SmartPaginator:
             return None
 
         # 估算可以放入的字符数
-        chars_per_line = self.content_width // self.CHAR_WIDTH
+        chars_per_line = self._chars_per_line
         min_lines = 2
-        max_lines = max(min_lines, (available_height - self.ELEMENT_HEIGHTS['p_base'] - self.ELEMENT_HEIGHTS['margin_bottom']) // self.ELEMENT_HEIGHTS['p_line'])
+        max_lines = max(min_lines, (available_height - eh['p_base'] - eh['margin_bottom']) // eh['p_line'])
         if max_lines < min_lines:
             return None
 
@@ -238,35 +439,25 @@ class SmartPaginator:
         # 在空白处切分（尽量不拆词）
         split_index = max_chars
         # 尝试往前找到一个空格或标点
-        match = re.search(r'[\s，。；；、,.!?)]', text[:max_chars][::-1])
+        match = _SPLIT_POINT_RE.search(text[:max_chars][::-1])
         if match:
             split_index = max_chars - match.start()
 
         part1_text = text[:split_index].rstrip()
         part2_text = text[split_index:].lstrip()
 
-        # 重新估算高度
-        def para_height(t: str) -> int:
-            if not t:
-                return self.ELEMENT_HEIGHTS['p_base'] + self.ELEMENT_HEIGHTS['margin_bottom']
-            total_width = 0
-            for ch in t:
-                total_width += self.CHAR_WIDTH if ord(ch) > 127 else self.CHAR_WIDTH_EN
-            lines = max(1, int(total_width / self.content_width) + 1)
-            return self.ELEMENT_HEIGHTS['p_base'] + lines * self.ELEMENT_HEIGHTS['p_line'] + self.ELEMENT_HEIGHTS['margin_bottom']
-
         part1 = PageElement(
             type='paragraph',
             content=f"<p>{part1_text}</p>",
             text=part1_text,
-            height=para_height(part1_text),
+            height=self._calculate_paragraph_height(part1_text),
             can_break=True
         )
         part2 = PageElement(
             type='paragraph',
             content=f"<p>{part2_text}</p>",
             text=part2_text,
-            height=para_height(part2_text),
+            height=self._calculate_paragraph_height(part2_text),
             can_break=True
         )
         return part1, part2
@@ -275,41 +466,32 @@ class SmartPaginator:
     # 高度估算辅助方法
     # ----------------------
     def _calculate_text_height(self, text: str) -> int:
-        """计算纯文本高度"""
-        if not text:
-            return self.ELEMENT_HEIGHTS['p_base'] + self.ELEMENT_HEIGHTS['margin_bottom']
-
-        total_width = 0
-        for ch in text:
-            total_width += self.CHAR_WIDTH if ord(ch) > 127 else self.CHAR_WIDTH_EN
-        lines = max(1, int(total_width / self.content_width) + 1)
-
-        return self.ELEMENT_HEIGHTS['p_base'] + lines * self.ELEMENT_HEIGHTS['p_line'] + self.ELEMENT_HEIGHTS['margin_bottom']
+        """计算纯文本高度（与段落使用同一套估算）"""
+        return self._calculate_paragraph_height(text)
 
     def _calculate_paragraph_height(self, text: str) -> int:
-        """计算段落高度"""
+        """计算段落高度（行数估算由 _estimate_text_lines 按 文本+宽度 缓存）"""
+        eh = self.ELEMENT_HEIGHTS
         if not text:
-            return self.ELEMENT_HEIGHTS['p_base'] + self.ELEMENT_HEIGHTS['margin_bottom']
-
+            return eh['p_base'] + eh['margin_bottom']
         # 更精确的计算（中英文混排）
-        total_width = 0
-        for ch in text:
-            total_width += self.CHAR_WIDTH if ord(ch) > 127 else self.CHAR_WIDTH_EN
-        lines = max(1, int(total_width / self.content_width) + 1)
+        lines = _estimate_text_lines(text, self.content_width, self.CHAR_WIDTH, self.CHAR_WIDTH_EN)
+        return eh['p_base'] + lines * eh['p_line'] + eh['margin_bottom']
 
-        return self.ELEMENT_HEIGHTS['p_base'] + lines * self.ELEMENT_HEIGHTS['p_line'] + self.ELEMENT_HEIGHTS['margin_bottom']
+    def _images_height(self, img_count: int) -> int:
+        """估算若干张图片的总高度"""
+        return img_count * self.image_height
 
     def _calculate_blockquote_height(self, text: str) -> int:
         """计算引用块高度"""
+        eh = self.ELEMENT_HEIGHTS
         if not text:
-            return self.ELEMENT_HEIGHTS['blockquote']
+            return eh['blockquote']
 
-        # 引用块内容宽度更窄
-        effective_width = self.content_width - 60
-        chars_per_line = max(1, effective_width // self.CHAR_WIDTH)
+        chars_per_line = self._blockquote_chars_per_line
         lines = max(1, (len(text) + chars_per_line - 1) // chars_per_line)
 
-        return self.ELEMENT_HEIGHTS['blockquote'] + lines * self.ELEMENT_HEIGHTS['blockquote_line'] + self.ELEMENT_HEIGHTS['margin_bottom']
+        return eh['blockquote'] + lines * eh['blockquote_line'] + eh['margin_bottom']
 
     def parse_html_to_elements(self, html: str) -> List[PageElement]:
         """
@@ -319,19 +501,16 @@ class SmartPaginator:
             return []
 
         # 使用BeautifulSoup解析HTML
-        soup = BeautifulSoup(html, 'html.parser')
+        soup = BeautifulSoup(html, HTML_PARSER)
+        top_nodes = self._top_level_nodes(soup)
+        self._node_sources = self._map_node_sources(html, top_nodes)
+        self._collect_pagebreak_markers(soup, html)
 
         # 收集所有元素
         elements = []
 
-        # 如果soup本身就是一个标签，处理它
-        if isinstance(soup, Tag):
-            nodes = list(soup.children)
-        else:
-            nodes = list(soup.children)
-
         # 遍历顶层节点
-        for node in nodes:
+        for node in top_nodes:
             if isinstance(node, Comment):
                 continue
             if isinstance(node, NavigableString):
@@ -350,10 +529,10 @@ class SmartPaginator:
                 continue
 
             # 处理分页标记
-            if self._is_pagebreak_marker(node):
+            if id(node) in self._pagebreak_ids:
                 elements.append(PageElement(
                     type='pagebreak',
-                    content=str(node),
+                    content=self._node_html(node),
                     text='',
                     height=self.ELEMENT_HEIGHTS['hr'],
                     can_break=False
@@ -364,257 +543,439 @@ class SmartPaginator:
             child_elements = self._process_node(node)
             elements.extend(child_elements)
 
+        self._node_sources = {}
+        self._pagebreak_ids = set()
+        self._pagebreak_ancestor_ids = set()
         return elements
 
-    def _process_node(self, node) -> List[PageElement]:
-        """递归处理节点"""
-        elements = []
+    def _collect_pagebreak_markers(self, soup: BeautifulSoup, html: str):
+        """
+        一次性找出所有分页标记及其祖先节点
 
-        if isinstance(node, NavigableString):
-            text = str(node).strip()
-            if text:
-                height = self._calculate_text_height(text)
-                elements.append(PageElement(
-                    type='text',
-                    content=text,
-                    text=text,
-                    height=height,
-                    can_break=True
-                ))
-            return elements
+        之后判断节点是否为标记/是否包含标记都只是集合查找，不再逐个节点读属性或扫描后代
+        """
+        marker_ids = set()
+        ancestor_ids = set()
+        # 分页标记的 class 与 data 属性都包含该关键字，不存在时无需查找
+        if 'pagebreak' in html:
+            # 单次遍历整棵树（soupsieve 的 select 为纯 Python 实现，实测比 find_all 慢）
+            for marker in soup.find_all(self._is_pagebreak_marker):
+                marker_ids.add(id(marker))
+                for parent in marker.parents:
+                    if id(parent) in ancestor_ids:
+                        break
+                    ancestor_ids.add(id(parent))
+        self._pagebreak_ids = marker_ids
+        self._pagebreak_ancestor_ids = ancestor_ids
+
+    @staticmethod
+    def _map_node_sources(html: str, top_nodes: list) -> Dict[int, str]:
+        """
+        将顶层标签节点映射到原始HTML中的对应片段
 
-        if not isinstance(node, Tag):
-            return elements
+        顶层块直接复用原文，省去 BeautifulSoup 的重新序列化；
+        原文结构与解析结果对不上时返回空映射，全部退回 str(node)
+        """
+        slices = _top_level_source_slices(html)
+        if slices is None:
+            return {}
+        tags = [node for node in top_nodes if type(node) is Tag]
+        if len(tags) != len(slices):
+            return {}
+        sources = {}
+        for node, (name, start, end) in zip(tags, slices):
+            if node.name.lower() != name:
+                return {}
+            sources[id(node)] = html[start:end]
+        return sources
+
+    def _map_child_sources(self, node: Tag):
+        """容器本身有原文片段时，把其子标签也映射到片段内的对应位置"""
+        source = self._node_sources.get(id(node))
+        if source is None:
+            return
+        open_tag = _TAG_TOKEN_RE.match(source)
+        close_start = source.rfind('</')
+        if open_tag is None or close_start < open_tag.end():
+            return
+        inner = source[open_tag.end():close_start]
+        self._node_sources.update(self._map_node_sources(inner, list(node.children)))
+
+    def _node_html(self, node: Tag) -> str:
+        """节点的HTML：能对应到原文的节点取原文片段，其余节点序列化"""
+        source = self._node_sources.get(id(node))
+        return source if source is not None else str(node)
+
+    def _open_tag_html(self, node: Tag) -> str:
+        """节点的开始标签（保留原有属性）：优先取原文片段，其余从序列化结果中截取"""
+        source = self._node_sources.get(id(node))
+        match = _TAG_TOKEN_RE.match(source if source is not None else str(node))
+        return match.group(0) if match else '<' + node.name + '>'
+
+    @staticmethod
+    def _top_level_nodes(soup: BeautifulSoup) -> list:
+        """获取HTML片段的顶层节点"""
+        if HTML_PARSER != 'lxml':
+            return list(soup.children)
+
+        # lxml 会为片段补全 <html>/<head>/<body>，片段开头的 <style> 等会被放入 head
+        nodes = []
+        for container in (soup.head, soup.body):
+            if container is not None:
+                nodes.extend(container.children)
+        return nodes if nodes else list(soup.children)
 
-        # 强制分页标记
-        if self._is_pagebreak_marker(node):
-            elements.append(PageElement(
-                type='pagebreak',
-                content=str(node),
-                text='',
-                height=self.ELEMENT_HEIGHTS['hr'],
-                can_break=False
-            ))
-            return elements
+    def _process_node(self, node) -> List[PageElement]:
+        """
+        处理节点及其子树
 
-        tag_name = node.name.lower()
+        使用显式栈代替递归：容器类节点把子节点逆序压栈，保证按文档顺序依次处理
+        """
+        elements = []
+        pagebreak_ids = self._pagebreak_ids
+        pagebreak_ancestor_ids = self._pagebreak_ancestor_ids
+        stack = [node]
 
-        # 先检查内部是否有分页标记
-        has_pagebreak = any(self._is_pagebreak_marker(child) for child in node.find_all() if isinstance(child, Tag))
+        while stack:
+            node = stack.pop()
 
-        if has_pagebreak:
-            # 递归处理包含分页标记的段落
-            for child in node.children:
-                elements.extend(self._process_node(child))
-        else:
-            # 处理具体的元素类型
-            if tag_name in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
-                # 标题
-                text = node.get_text(strip=True)
+            if isinstance(node, NavigableString):
+                text = str(node).strip()
                 if text:
-                    level = int(tag_name[1])
-                    height = self.ELEMENT_HEIGHTS[tag_name] + self.ELEMENT_HEIGHTS['margin_bottom']
+                    height = self._calculate_text_height(text)
                     elements.append(PageElement(
-                        type='heading',
-                        content=str(node),
+                        type='text',
+                        content=text,
                         text=text,
-                        level=level,
                         height=height,
-                        can_break=False
+                        can_break=True
                     ))
+                continue
 
-            elif tag_name == 'p':
-                # 普通段落
-                text = node.get_text(strip=True)
-                imgs = node.find_all('img')
-                if text:
-                    if imgs:
-                        # 包含图片的段落（图文）
-                        text_height = self._calculate_paragraph_height(text)
-                        img_height = len(imgs) * 300
-                        total_height = text_height + img_height
-                        elements.append(PageElement(
-                            type='paragraph_with_images',
-                            content=str(node),
-                            text=text,
-                            height=total_height,
-                            can_break=False
-                        ))
-                    else:
-                        # 纯文本段落
-                        height = self._calculate_paragraph_height(text)
-                        elements.append(PageElement(
-                            type='paragraph',
-                            content=str(node),
-                            text=text,
-                            height=height,
-                            can_break=True
-                        ))
-                else:
-                    # 没有文本内容
-                    if imgs:
-                        # 纯图片段落（如 <p><img/></p>）
-                        total_height = len(imgs) * 300 + self.ELEMENT_HEIGHTS['margin_bottom']
-                        elements.append(PageElement(
-                            type='paragraph_with_images',
-                            content=str(node),
-                            text='',
-                            height=total_height,
-                            can_break=False
-                        ))
-                    else:
-                        # 空段落，给最小基础高度，避免被完全忽略
-                        height = self.ELEMENT_HEIGHTS['p_base']
-                        elements.append(PageElement(
-                            type='paragraph',
-                            content=str(node),
-                            text='',
-                            height=height,
-                            can_break=True
-                        ))
-
-            elif tag_name == 'img':
-                # 图片
-                alt = node.get('alt', '图片')
+            if not isinstance(node, Tag):
+                continue
+
+            # 强制分页标记
+            if id(node) in pagebreak_ids:
                 elements.append(PageElement(
-                    type='image',
-                    content=str(node),
-                    text=alt,
-                    height=300 + self.ELEMENT_HEIGHTS['margin_bottom'],
+                    type='pagebreak',
+                    content=self._node_html(node),
+                    text='',
+                    height=self.ELEMENT_HEIGHTS['hr'],
                     can_break=False
                 ))
+                continue
 
-            elif tag_name in ['ul', 'ol']:
-                # 列表
-                items = node.find_all('li', recursive=False)
-                imgs = node.find_all('img')
-                list_height = len(items) * self.ELEMENT_HEIGHTS['li']
-                img_height = len(imgs) * 300
-                total_height = list_height + img_height + self.ELEMENT_HEIGHTS['margin_bottom']
-                elements.append(PageElement(
-                    type='list',
-                    content=str(node),
-                    text=node.get_text(strip=True),
-                    height=total_height,
-                    can_break=True
-                ))
+            tag_name = node.name.lower()
 
-            elif tag_name == 'pre':
-                # 代码块
-                code_elem = node.find('code')
-                code_text = code_elem.get_text() if code_elem else node.get_text()
-                lines = max(1, len(code_text.splitlines()))
-                height = (self.ELEMENT_HEIGHTS['code_block'] +
-                          lines * self.ELEMENT_HEIGHTS['code_line'] +
-                          self.ELEMENT_HEIGHTS['margin_bottom'])
-                elements.append(PageElement(
-                    type='code',
-                    content=str(node),
-                    text=code_text,
-                    height=height,
-                    can_break=lines > 10
-                ))
+            # 先检查内部是否有分页标记（解析时已记录所有标记的祖先节点）
+            if id(node) in pagebreak_ancestor_ids:
+                if tag_name == 'p':
+                    # 段落内的分页标记：按标记切成多段
+                    elements.extend(self._split_paragraph_at_pagebreaks(node))
+                    continue
+                # 包含分页标记的容器：展开子节点
+                result = None
+            else:
+                # 按标签分发到具体的处理方法，未登记的标签按普通元素处理；
+                # 容器标签（或处理方法返回 None）表示展开子节点
+                handler = self._tag_handlers.get(tag_name, self._parse_other)
+                result = handler(node) if handler is not None else None
 
-            elif tag_name == 'blockquote':
-                # 引用块
-                text = node.get_text(strip=True)
-                imgs = node.find_all('img')
-                if text:
-                    text_height = self._calculate_blockquote_height(text)
-                    img_height = len(imgs) * 300
-                    total_height = text_height + img_height
-                    elements.append(PageElement(
-                        type='blockquote',
-                        content=str(node),
-                        text=text,
-                        height=total_height,
-                        can_break=True
-                    ))
-                else:
-                    if imgs:
-                        total_height = len(imgs) * 300 + self.ELEMENT_HEIGHTS['margin_bottom']
-                        elements.append(PageElement(
-                            type='blockquote',
-                            content=str(node),
-                            text='',
-                            height=total_height,
-                            can_break=False
-                        ))
-                    else:
-                        # 空引用块，给基础高度
-                        height = self.ELEMENT_HEIGHTS['blockquote'] + self.ELEMENT_HEIGHTS['margin_bottom']
-                        elements.append(PageElement(
-                            type='blockquote',
-                            content=str(node),
-                            text='',
-                            height=height,
-                            can_break=True
-                        ))
-
-            elif tag_name == 'table':
-                # 表格
-                rows = node.find_all('tr')
-                if rows:
-                    headers = node.find_all('th')
-                    text = node.get_text(strip=True)
-
-                    height = (len(headers) * self.ELEMENT_HEIGHTS['table_header'] +
-                              (len(rows) - len(headers)) * self.ELEMENT_HEIGHTS['table_row'] +
-                              self.ELEMENT_HEIGHTS['margin_bottom'])
+            if result is not None:
+                elements.extend(result)
+            else:
+                self._map_child_sources(node)
+                stack.extend(reversed(node.contents))
 
-                    elements.append(PageElement(
-                        type='table',
-                        content=str(node),
-                        text=text,
-                        height=height,
-                        can_break=True
-                    ))
-                else:
-                    elements.append(PageElement(
-                        type='table',
-                        content=str(node),
-                        text='',
-                        height=self.ELEMENT_HEIGHTS['table_row'] + self.ELEMENT_HEIGHTS['margin_bottom'],
-                        can_break=True
-                    ))
+        return elements
 
-            elif tag_name == 'hr':
-                # 分隔线
-                elements.append(PageElement(
-                    type='hr',
-                    content=str(node),
-                    text='',
-                    height=self.ELEMENT_HEIGHTS['hr'],
+    @staticmethod
+    def _scan_subtree(node: Tag, count_tags: Tuple[str, ...] = ('img',)) -> Tuple[str, Dict[str, int]]:
+        """
+        单次遍历子树，同时得到文本与指定标签的数量
+
+        文本与 node.get_text(strip=True) 一致，各标签数与 len(node.find_all(tag)) 一致
+        """
+        types = node.interesting_string_types
+        if types is None:
+            types = (NavigableString, CData)
+        elif isinstance(types, type):
+            types = (types,)
+
+        parts = []
+        counts = dict.fromkeys(count_tags, 0)
+        for desc in node.descendants:
+            if isinstance(desc, NavigableString):
+                if type(desc) in types:
+                    stripped = desc.strip()
+                    if stripped:
+                        parts.append(stripped)
+            elif desc.name in counts:
+                counts[desc.name] += 1
+        return ''.join(parts), counts
+
+    def _parse_heading(self, node: Tag) -> List[PageElement]:
+        """标题"""
+        eh = self.ELEMENT_HEIGHTS
+        text = node.get_text(strip=True)
+        if not text:
+            return []
+        tag_name = node.name.lower()
+        height = eh[tag_name] + eh['margin_bottom']
+        return [PageElement(
+            type='heading',
+            content=self._node_html(node),
+            text=text,
+            level=int(tag_name[1]),
+            height=height,
+            can_break=False
+        )]
+
+    def _parse_paragraph(self, node: Tag) -> List[PageElement]:
+        """普通段落"""
+        text, counts = self._scan_subtree(node)
+        img_count = counts['img']
+        return [self._make_paragraph(self._node_html(node), text, img_count)]
+
+    def _make_paragraph(self, content: str, text: str, img_count: int) -> PageElement:
+        """根据文本与图片数量构造段落元素"""
+        eh = self.ELEMENT_HEIGHTS
+        if text:
+            if img_count:
+                # 包含图片的段落（图文）
+                text_height = self._calculate_paragraph_height(text)
+                img_height = self._images_height(img_count)
+                total_height = text_height + img_height
+                return PageElement(
+                    type='paragraph_with_images',
+                    content=content,
+                    text=text,
+                    height=total_height,
                     can_break=False
-                ))
+                )
+            # 纯文本段落
+            height = self._calculate_paragraph_height(text)
+            return PageElement(
+                type='paragraph',
+                content=content,
+                text=text,
+                height=height,
+                can_break=True
+            )
+
+        # 没有文本内容
+        if img_count:
+            # 纯图片段落（如 <p><img/></p>）
+            total_height = self._images_height(img_count) + eh['margin_bottom']
+            return PageElement(
+                type='paragraph_with_images',
+                content=content,
+                text='',
+                height=total_height,
+                can_break=False
+            )
+        # 空段落，给最小基础高度，避免被完全忽略
+        return PageElement(
+            type='paragraph',
+            content=content,
+            text='',
+            height=eh['p_base'],
+            can_break=True
+        )
 
-            elif tag_name in ['div', 'section', 'article', 'main']:
-                # 容器：递归处理子元素
-                for child in node.children:
-                    child_elements = self._process_node(child)
-                    elements.extend(child_elements)
+    def _split_paragraph_at_pagebreaks(self, node: Tag) -> List[PageElement]:
+        """
+        按分页标记切分段落（单次遍历子节点）
 
+        标记之间连续的行内内容合并为一个段落（文本提取方式与 _parse_paragraph 一致），
+        含标记的子节点和块级子节点单独处理，避免生成嵌套的 <p>
+        """
+        block_tags = self.BLOCK_TAGS
+        open_tag = self._open_tag_html(node)
+        close_tag = '</' + node.name + '>'
+        elements = []
+        run_html = []
+        run_text = []
+        run_imgs = 0
+
+        def flush():
+            nonlocal run_html, run_text, run_imgs
+            text = ''.join(run_text)
+            if text or run_imgs:
+                content = open_tag + ''.join(run_html) + close_tag
+                elements.append(self._make_paragraph(content, text, run_imgs))
+            run_html, run_text, run_imgs = [], [], 0
+
+        for child in node.children:
+            if isinstance(child, Comment):
+                continue
+            if isinstance(child, Tag):
+                if (id(child) in self._pagebreak_ids or id(child) in self._pagebreak_ancestor_ids
+                        or child.name in block_tags):
+                    flush()
+                    elements.extend(self._process_node(child))
+                    continue
+                run_text.append(child.get_text(strip=True))
+                run_imgs += 1 if child.name == 'img' else len(child.find_all('img'))
+            elif isinstance(child, NavigableString):
+                run_text.append(child.strip())
             else:
-                # 其他元素
-                text = node.get_text(strip=True)
-                if text:
-                    # 如果包含子标签，递归处理子节点
-                    if node.find_all():
-                        for child in node.children:
-                            child_elements = self._process_node(child)
-                            elements.extend(child_elements)
-                    else:
-                        # 纯文本内容
-                        elements.append(PageElement(
-                            type='unknown',
-                            content=str(node),
-                            text=text,
-                            height=self._calculate_text_height(text),
-                            can_break=True
-                        ))
-
+                continue
+            run_html.append(str(child))
+        flush()
         return elements
 
+    def _parse_image(self, node: Tag) -> List[PageElement]:
+        """图片"""
+        alt = node.get('alt', '图片')
+        return [PageElement(
+            type='image',
+            content=self._node_html(node),
+            text=alt,
+            height=self._images_height(1) + self.ELEMENT_HEIGHTS['margin_bottom'],
+            can_break=False
+        )]
+
+    def _parse_list(self, node: Tag) -> List[PageElement]:
+        """列表"""
+        eh = self.ELEMENT_HEIGHTS
+        # 只统计直接子级 li，不为计数构造列表
+        item_count = sum(1 for child in node.children if child.name == 'li')
+        text, counts = self._scan_subtree(node)
+        img_count = counts['img']
+        list_height = item_count * eh['li']
+        img_height = self._images_height(img_count)
+        total_height = list_height + img_height + eh['margin_bottom']
+        return [PageElement(
+            type='list',
+            content=self._node_html(node),
+            text=text,
+            height=total_height,
+            can_break=True
+        )]
+
+    def _parse_code(self, node: Tag) -> List[PageElement]:
+        """代码块"""
+        eh = self.ELEMENT_HEIGHTS
+        code_elem = node.find('code')
+        code_text = code_elem.get_text() if code_elem else node.get_text()
+        lines = max(1, len(code_text.splitlines()))
+        height = (eh['code_block'] +
+                  lines * eh['code_line'] +
+                  eh['margin_bottom'])
+        return [PageElement(
+            type='code',
+            content=self._node_html(node),
+            text=code_text,
+            height=height,
+            can_break=lines > 10
+        )]
+
+    def _parse_blockquote(self, node: Tag) -> List[PageElement]:
+        """引用块"""
+        eh = self.ELEMENT_HEIGHTS
+        text, counts = self._scan_subtree(node)
+        img_count = counts['img']
+        if text:
+            text_height = self._calculate_blockquote_height(text)
+            img_height = self._images_height(img_count)
+            total_height = text_height + img_height
+            return [PageElement(
+                type='blockquote',
+                content=self._node_html(node),
+                text=text,
+                height=total_height,
+                can_break=True
+            )]
+        if img_count:
+            total_height = self._images_height(img_count) + eh['margin_bottom']
+            return [PageElement(
+                type='blockquote',
+                content=self._node_html(node),
+                text='',
+                height=total_height,
+                can_break=False
+            )]
+        # 空引用块，给基础高度
+        height = eh['blockquote'] + eh['margin_bottom']
+        return [PageElement(
+            type='blockquote',
+            content=self._node_html(node),
+            text='',
+            height=height,
+            can_break=True
+        )]
+
+    def _parse_table(self, node: Tag) -> List[PageElement]:
+        """表格"""
+        eh = self.ELEMENT_HEIGHTS
+        # 一次遍历同时得到文本、行数与表头单元格数（tr 通常位于 thead/tbody 内，需遍历后代）
+        text, counts = self._scan_subtree(node, ('tr', 'th'))
+        row_count = counts['tr']
+        header_count = counts['th']
+
+        if not row_count:
+            return [PageElement(
+                type='table',
+                content=self._node_html(node),
+                text='',
+                height=eh['table_row'] + eh['margin_bottom'],
+                can_break=True
+            )]
+
+        height = (header_count * eh['table_header'] +
+                  (row_count - header_count) * eh['table_row'] +
+                  eh['margin_bottom'])
+        return [PageElement(
+            type='table',
+            content=self._node_html(node),
+            text=text,
+            height=height,
+            can_break=True
+        )]
+
+    def _parse_style(self, node: Tag) -> List[PageElement]:
+        """样式/脚本：保留在页面中，但不可见，不占高度"""
+        return [PageElement(
+            type='style',
+            content=self._node_html(node),
+            text='',
+            height=0,
+            can_break=False
+        )]
+
+    def _parse_hr(self, node: Tag) -> List[PageElement]:
+        """分隔线"""
+        return [PageElement(
+            type='hr',
+            content=self._node_html(node),
+            text='',
+            height=self.ELEMENT_HEIGHTS['hr'],
+            can_break=False
+        )]
+
+    def _parse_other(self, node: Tag) -> Optional[List[PageElement]]:
+        """其他元素（返回 None 表示由调用方展开子节点）"""
+        # 如果包含子标签，交由调用方处理子节点（子节点会各自提取文本，
+        # 这里只需判断是否存在非空文本，不拼接整棵子树的文本）
+        if node.find(True) is not None:
+            if next(node.stripped_strings, None) is None:
+                return []
+            return None
+
+        # 纯文本内容
+        text = node.get_text(strip=True)
+        if not text:
+            return []
+        return [PageElement(
+            type='unknown',
+            content=self._node_html(node),
+            text=text,
+            height=self._calculate_text_height(text),
+            can_break=True
+        )]
+
     def _is_pagebreak_marker(self, element: Tag) -> bool:
         """
         检查元素是否是分页标记
@@ -634,44 +995,51 @@ class SmartPaginator:
 
         return False
 
-    def optimize_pages(self, pages: List[str]) -> List[str]:
+    def optimize_pages(self, pages: List[str], page_heights: Optional[List[int]] = None) -> List[str]:
         """
         优化分页结果，合并过短的页面
+
+        Args:
+            pages: 分页后的HTML内容列表
+            page_heights: 各页总高度（paginate 内部调用时直接传入；省略时从已记录的页面布局获取）
         """
         if len(pages) <= 1:
             return pages
 
+        if page_heights is None:
+            page_heights = [self._get_page_layout(page)[1] if page and page.strip() else 0
+                            for page in pages]
+
         optimized = []
         i = 0
+        page_count = len(pages)
 
-        # 根据页面尺寸调整合并阈值
-        merge_threshold = 0.3 if self.page_size_name == "small" else 0.35
+        # 合并阈值随页面尺寸在 set_page_size 中算好
+        merge_threshold_px = self._merge_threshold_px
+        merge_limit_px = self._merge_limit_px
 
-        while i < len(pages):
+        while i < page_count:
             current_page = pages[i]
             if not current_page or not current_page.strip():
                 i += 1
                 continue
 
-            # 估算当前页面高度
-            current_elements = self.parse_html_to_elements(current_page)
-            current_height = sum(e.height for e in current_elements)
-
-            # 如果页面过短，尝试与下一页合并
-            if current_height < self.content_height * merge_threshold and i < len(pages) - 1:
-                next_page_index = i + 1
-                # 不合并强制分页的页面
-                if next_page_index not in self.forced_break_pages:
-                    next_page = pages[next_page_index]
-                    if next_page and next_page.strip():
-                        next_elements = self.parse_html_to_elements(next_page)
-                        next_height = sum(e.height for e in next_elements)
-
-                        # 如果合并后不超过最大高度，则合并
-                        if current_height + next_height <= self.content_height * 0.95:  # 留5%余量
-                            optimized.append(current_page + '\n' + next_page)
-                            i += 2
-                            continue
+            # 如果页面过短，尝试与下一页合并（只做整数比较，高度已预先算好）
+            current_height = page_heights[i]
+            next_page_index = i + 1
+            if (current_height < merge_threshold_px and next_page_index < page_count
+                    # 不合并强制分页的页面
+                    and next_page_index not in self.forced_break_pages):
+                next_page = pages[next_page_index]
+                next_height = page_heights[next_page_index]
+                # 如果合并后不超过最大高度，则合并
+                if next_page and next_page.strip() and current_height + next_height <= merge_limit_px:
+                    merged_page = current_page + '\n' + next_page
+                    merged_elements = self._get_page_layout(current_page)[0] + self._get_page_layout(next_page)[0]
+                    self._remember_page_layout(merged_page, merged_elements, current_height + next_height)
+                    optimized.append(merged_page)
+                    i += 2
+                    continue
 
             optimized.append(current_page)
             i += 1
@@ -686,8 +1054,7 @@ class SmartPaginator:
         pages_info = []
 
         for i, page in enumerate(pages, start=1):
-            page_elements = self.parse_html_to_elements(page)
-            total_height = sum(e.height for e in page_elements)
+            page_elements, total_height = self._get_page_layout(page)
 
             pages_info.append({
                 'page_index': i,
@@ -1,11 +1,68 @@
 # ============================================
 # src/utils/style_manager.py
 # ============================================
-from typing import Dict, Any, Tuple
-from dataclasses import dataclass
+from typing import Dict, Any, Tuple, Mapping
+from dataclasses import dataclass, field, asdict
+from functools import lru_cache
+from types import MappingProxyType
 import colorsys
+import re
+import sys
 
-@dataclass
+
+def _hex_to_rgb(hex_color: str) -> Tuple[int, int, int]:
+    """十六进制颜色转RGB"""
+    hex_color = hex_color.lstrip('#')
+    if len(hex_color) == 3:
+        # 简写形式 #abc 等价于 #aabbcc
+        hex_color = ''.join(c * 2 for c in hex_color)
+    elif len(hex_color) < 6:
+        raise ValueError(f"无效的十六进制颜色: #{hex_color}")
+    # 一次解析为24位整数，再按字节拆分
+    v = int(hex_color[:6], 16)
+    return (v >> 16, (v >> 8) & 0xFF, v & 0xFF)
+
+
+# 颜色/幅度组合非常有限（主题数 × 少量幅度），结果直接缓存
+@lru_cache(maxsize=128)
+def _lighten(hex_color: str, amount: float) -> str:
+    """使颜色变浅（amount: 0-1）"""
+    r, g, b = _hex_to_rgb(hex_color)
+    # 转换为HSL
+    h, l, s = colorsys.rgb_to_hls(r/255, g/255, b/255)
+    # 增加亮度
+    l = min(1.0, l + (1 - l) * amount)
+    # 转回RGB
+    r, g, b = colorsys.hls_to_rgb(h, l, s)
+    return f"#{(int(r*255) << 16) | (int(g*255) << 8) | int(b*255):06x}"
+
+
+@lru_cache(maxsize=128)
+def _darken(hex_color: str, amount: float) -> str:
+    """使颜色变深（amount: 0-1）"""
+    r, g, b = _hex_to_rgb(hex_color)
+    # 转换为HSL
+    h, l, s = colorsys.rgb_to_hls(r/255, g/255, b/255)
+    # 降低亮度
+    l = max(0.0, l * (1 - amount))
+    # 转回RGB
+    r, g, b = colorsys.hls_to_rgb(h, l, s)
+    return f"#{(int(r*255) << 16) | (int(g*255) << 8) | int(b*255):06x}"
+
+
+@lru_cache(maxsize=128)
+def _add_alpha(hex_color: str, alpha: float) -> str:
+    """添加透明度（返回rgba格式）"""
+    r, g, b = _hex_to_rgb(hex_color)
+    return f"rgba({r}, {g}, {b}, {alpha})"
+
+# 主题配置创建后不再修改：冻结后可作为缓存键；Python 3.10+ 同时启用 __slots__
+_THEME_DATACLASS_OPTIONS = {'frozen': True}
+if sys.version_info >= (3, 10):
+    _THEME_DATACLASS_OPTIONS['slots'] = True
+
+
+@dataclass(**_THEME_DATACLASS_OPTIONS)
 class ThemeConfig:
     """主题配置"""
     name: str
@@ -19,254 +76,41 @@ class ThemeConfig:
     accent_color: str = ""  # 强调色
     link_color: str = ""    # 链接色
     
-class StyleManager:
-    """样式管理器 - 扩展版"""
+    # 派生颜色（创建时计算一次，生成CSS时直接引用）
+    primary_light: str = field(init=False, repr=False, default="")
+    primary_dark: str = field(init=False, repr=False, default="")
+    secondary_light: str = field(init=False, repr=False, default="")
+    text_light: str = field(init=False, repr=False, default="")     # 变浅10%
+    text_lighter: str = field(init=False, repr=False, default="")   # 变浅20%
+    text_dark: str = field(init=False, repr=False, default="")      # 变深10%
+    text_darker: str = field(init=False, repr=False, default="")    # 变深20%
     
-    # 预设主题 - 12种风格
-    THEMES = {
-        # 社交媒体风格
-        "xiaohongshu": ThemeConfig(
-            name="小红书经典",
-            primary_color="#FF2442",
-            secondary_color="#FF6B6B",
-            text_color="#2c3e50",
-            background="linear-gradient(135deg, #ffeef8 0%, #ffe0f0 100%)",
-            font_family='-apple-system, BlinkMacSystemFont, "PingFang SC", "Helvetica Neue", "Microsoft YaHei", sans-serif',
-            heading_font='"PingFang SC", "Helvetica Neue", sans-serif',
-            code_font='"JetBrains Mono", "Cascadia Code", "Consolas", monospace',
-            accent_color="#FFB6C1",
-            link_color="#FF69B4"
-        ),
-        
-        "instagram": ThemeConfig(
-            name="Instagram渐变",
-            primary_color="#E4405F",
-            secondary_color="#BC2A8D",
-            text_color="#262626",
-            background="linear-gradient(45deg, #F9ED69 0%, #EE2A7B 50%, #6228D7 100%)",
-            font_family='-apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, Helvetica, Arial, sans-serif',
-            heading_font='"Segoe UI", Roboto, sans-serif',
-            code_font='"Monaco", "Courier New", monospace',
-            accent_color="#FCAF45",
-            link_color="#833AB4"
-        ),
-        
-        "wechat": ThemeConfig(
-            name="微信简约",
-            primary_color="#07C160",
-            secondary_color="#4CAF50",
-            text_color="#353535",
-            background="linear-gradient(180deg, #F7F7F7 0%, #FFFFFF 100%)",
-            font_family='"PingFang SC", "Hiragino Sans GB", "Microsoft YaHei", sans-serif',
-            heading_font='"PingFang SC", "Microsoft YaHei", sans-serif',
-            code_font='"SF Mono", "Monaco", "Inconsolata", monospace',
-            accent_color="#95EC69",
-            link_color="#576B95"
-        ),
-        
-        "douyin": ThemeConfig(
-            name="抖音酷黑",
-            primary_color="#FE2C55",
-            secondary_color="#25F4EE",
-            text_color="#FFFFFF",
-            background="linear-gradient(135deg, #000000 0%, #161823 100%)",
-            font_family='"PingFang SC", "Helvetica Neue", Arial, sans-serif',
-            heading_font='"PingFang SC", "Helvetica Neue", sans-serif',
-            code_font='"Fira Code", "Source Code Pro", monospace',
-            accent_color="#00F2EA",
-            link_color="#FE2C55"
-        ),
-        
-        # 知识平台风格
-        "zhihu": ThemeConfig(
-            name="知乎蓝",
-            primary_color="#0084FF",
-            secondary_color="#1890FF",
-            text_color="#1A1A1A",
-            background="linear-gradient(180deg, #FFFFFF 0%, #F6F6F6 100%)",
-            font_family='"PingFang SC", "Helvetica Neue", "Microsoft YaHei", sans-serif',
-            heading_font='"PingFang SC", "Helvetica Neue", sans-serif',
-            code_font='"Source Code Pro", "Consolas", monospace',
-            accent_color="#5BBCFF",
-            link_color="#175199"
-        ),
-        
-        "notion": ThemeConfig(
-            name="Notion极简",
-            primary_color="#000000",
-            secondary_color="#2F3437",
-            text_color="#37352F",
-            background="linear-gradient(180deg, #FFFFFF 0%, #FAFAFA 100%)",
-            font_family='"Inter", -apple-system, BlinkMacSystemFont, "Segoe UI", sans-serif',
-            heading_font='"Inter", -apple-system, sans-serif',
-            code_font='"SFMono-Regular", "Consolas", "Liberation Mono", monospace',
-            accent_color="#EB5757",
-            link_color="#0070F3"
-        ),
-        
-        # 优雅风格
-        "elegant_purple": ThemeConfig(
-            name="优雅紫",
-            primary_color="#6B46C1",
-            secondary_color="#9333EA",
-            text_color="#1F2937",
-            background="linear-gradient(135deg, #F9FAFB 0%, #F3E8FF 100%)",
-            font_family='"Inter", "PingFang SC", "Microsoft YaHei", sans-serif',
-            heading_font='"Playfair Display", "PingFang SC", serif',
-            code_font='"JetBrains Mono", "Cascadia Code", monospace',
-            accent_color="#A78BFA",
-            link_color="#7C3AED"
-        ),
-        
-        "ocean_blue": ThemeConfig(
-            name="海洋蓝",
-            primary_color="#0EA5E9",
-            secondary_color="#06B6D4",
-            text_color="#0F172A",
-            background="linear-gradient(135deg, #F0F9FF 0%, #E0F2FE 50%, #BAE6FD 100%)",
-            font_family='"Inter", "PingFang SC", "Microsoft YaHei", sans-serif',
-            heading_font='"Inter", "PingFang SC", sans-serif',
-            code_font='"Fira Code", "Consolas", monospace',
-            accent_color="#38BDF8",
-            link_color="#0284C7"
-        ),
-        
-        "sunset_orange": ThemeConfig(
-            name="日落橙",
-            primary_color="#F97316",
-            secondary_color="#FB923C",
-            text_color="#1C1917",
-            background="linear-gradient(135deg, #FFF7ED 0%, #FED7AA 50%, #FDBA74 100%)",
-            font_family='"Inter", "PingFang SC", "Microsoft YaHei", sans-serif',
-            heading_font='"Inter", "PingFang SC", sans-serif',
-            code_font='"Source Code Pro", "Monaco", monospace',
-            accent_color="#FCD34D",
-            link_color="#EA580C"
-        ),
-        
-        "forest_green": ThemeConfig(
-            name="森林绿",
-            primary_color="#059669",
-            secondary_color="#10B981",
-            text_color="#064E3B",
-            background="linear-gradient(135deg, #ECFDF5 0%, #D1FAE5 50%, #A7F3D0 100%)",
-            font_family='"Inter", "PingFang SC", "Microsoft YaHei", sans-serif',
-            heading_font='"Inter", "PingFang SC", sans-serif',
-            code_font='"JetBrains Mono", monospace',
-            accent_color="#34D399",
-            link_color="#047857"
-        ),
-        
-        # 深色主题
-        "dark_mode": ThemeConfig(
-            name="深色模式",
-            primary_color="#00E0FF",
-            secondary_color="#0096FF",
-            text_color="#E0E6ED",
-            background="linear-gradient(135deg, #0F0F1E 0%, #1A1A2E 50%, #16213E 100%)",
-            font_family='"Inter", "PingFang SC", "Microsoft YaHei", sans-serif',
-            heading_font='"Inter", "PingFang SC", sans-serif',
-            code_font='"Fira Code", "JetBrains Mono", monospace',
-            accent_color="#00F0FF",
-            link_color="#00B8D4"
-        ),
-        
-        "midnight": ThemeConfig(
-            name="午夜紫",
-            primary_color="#B794F4",
-            secondary_color="#9F7AEA",
-            text_color="#E9D8FD",
-            background="linear-gradient(135deg, #1A202C 0%, #2D3748 50%, #4A5568 100%)",
-            font_family='"Inter", "PingFang SC", "Microsoft YaHei", sans-serif',
-            heading_font='"Inter", "PingFang SC", sans-serif',
-            code_font='"Cascadia Code", "Fira Code", monospace',
-            accent_color="#D6BCFA",
-            link_color="#B794F4"
-        )
-    }
-    
-    def __init__(self, theme: str = "xiaohongshu"):
-        self.current_theme = theme
-        self.custom_styles = {}
-        
-    def get_theme(self, theme_name: str = None) -> ThemeConfig:
-        """获取主题配置"""
-        if theme_name is None:
-            theme_name = self.current_theme
-        return self.THEMES.get(theme_name, self.THEMES["xiaohongshu"])
-    
-    def get_theme_list(self) -> list:
-        """获取所有主题列表"""
-        return list(self.THEMES.keys())
-    
-    def get_theme_display_names(self) -> Dict[str, str]:
-        """获取主题显示名称"""
-        return {key: theme.name for key, theme in self.THEMES.items()}
-    
-    def set_theme(self, theme_name: str):
-        """设置当前主题"""
-        if theme_name in self.THEMES:
-            self.current_theme = theme_name
-    
-    def hex_to_rgb(self, hex_color: str) -> Tuple[int, int, int]:
-        """十六进制颜色转RGB"""
-        hex_color = hex_color.lstrip('#')
-        return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
-    
-    def rgb_to_hex(self, r: int, g: int, b: int) -> str:
-        """RGB转十六进制"""
-        return f"#{r:02x}{g:02x}{b:02x}"
-    
-    def lighten_color(self, hex_color: str, amount: float) -> str:
-        """使颜色变浅（amount: 0-1）"""
-        r, g, b = self.hex_to_rgb(hex_color)
-        # 转换为HSL
-        h, l, s = colorsys.rgb_to_hls(r/255, g/255, b/255)
-        # 增加亮度
-        l = min(1.0, l + (1 - l) * amount)
-        # 转回RGB
-        r, g, b = colorsys.hls_to_rgb(h, l, s)
-        return self.rgb_to_hex(int(r*255), int(g*255), int(b*255))
-    
-    def darken_color(self, hex_color: str, amount: float) -> str:
-        """使颜色变深（amount: 0-1）"""
-        r, g, b = self.hex_to_rgb(hex_color)
-        # 转换为HSL
-        h, l, s = colorsys.rgb_to_hls(r/255, g/255, b/255)
-        # 降低亮度
-        l = max(0.0, l * (1 - amount))
-        # 转回RGB
-        r, g, b = colorsys.hls_to_rgb(h, l, s)
-        return self.rgb_to_hex(int(r*255), int(g*255), int(b*255))
-    
-    def add_alpha(self, hex_color: str, alpha: float) -> str:
-        """添加透明度（返回rgba格式）"""
-        r, g, b = self.hex_to_rgb(hex_color)
-        return f"rgba({r}, {g}, {b}, {alpha})"
-    
-    def generate_css(self, theme_name: str = None, font_size: int = 18) -> str:
-        """生成主题CSS"""
-        theme = self.get_theme(theme_name)
-        
-        # 生成派生颜色
-        primary_light = self.lighten_color(theme.primary_color, 0.9)
-        primary_dark = self.darken_color(theme.primary_color, 0.2)
-        secondary_light = self.lighten_color(theme.secondary_color, 0.9)
-        
-        # 检查是否为深色主题
-        is_dark = theme_name in ["dark_mode", "midnight", "douyin"]
-        
-        return f"""
-        /* 主题: {theme.name} */
+    def __post_init__(self):
+        # 冻结的 dataclass 需要绕过 __setattr__ 写入派生字段
+        set_field = object.__setattr__
+        set_field(self, 'primary_light', _lighten(self.primary_color, 0.9))
+        set_field(self, 'primary_dark', _darken(self.primary_color, 0.2))
+        set_field(self, 'secondary_light', _lighten(self.secondary_color, 0.9))
+        set_field(self, 'text_light', _lighten(self.text_color, 0.1))
+        set_field(self, 'text_lighter', _lighten(self.text_color, 0.2))
+        set_field(self, 'text_dark', _darken(self.text_color, 0.1))
+        set_field(self, 'text_darker', _darken(self.text_color, 0.2))
+
+
+# ============================================
+# 主题CSS模板（模块加载时定义一次，通过 format_map 填充）
+# ============================================
+_CSS_TEMPLATE = """
+        /* 主题: {name} */
         :root {{
-            --primary-color: {theme.primary_color};
-            --secondary-color: {theme.secondary_color};
-            --accent-color: {theme.accent_color or theme.secondary_color};
-            --text-color: {theme.text_color};
-            --link-color: {theme.link_color or theme.primary_color};
-            --font-family: {theme.font_family};
-            --heading-font: {theme.heading_font};
-            --code-font: {theme.code_font};
+            --primary-color: {primary_color};
+            --secondary-color: {secondary_color};
+            --accent-color: {accent};
+            --text-color: {text_color};
+            --link-color: {link};
+            --font-family: {font_family};
+            --heading-font: {heading_font};
+            --code-font: {code_font};
             --primary-light: {primary_light};
             --primary-dark: {primary_dark};
             --secondary-light: {secondary_light};
@@ -281,7 +125,7 @@ class StyleManager:
         
         body {{
             font-family: var(--font-family);
-            background: {theme.background};
+            background: {background};
             color: var(--text-color);
             font-size: var(--base-font-size);
             line-height: 1.85;
@@ -301,7 +145,7 @@ class StyleManager:
             font-size: calc(var(--base-font-size) + 16px);
             margin-bottom: 28px;
             padding-bottom: 16px;
-            border-bottom: 3px solid {self.add_alpha(theme.primary_color, 0.2)};
+            border-bottom: 3px solid {primary_a20};
             background: linear-gradient(135deg, var(--primary-color), var(--secondary-color));
             -webkit-background-clip: text;
             -webkit-text-fill-color: transparent;
@@ -326,14 +170,14 @@ class StyleManager:
             height: 24px;
             background: linear-gradient(180deg, var(--primary-color), var(--secondary-color));
             border-radius: 3px;
-            box-shadow: 0 2px 8px {self.add_alpha(theme.primary_color, 0.3)};
+            box-shadow: 0 2px 8px {primary_a30};
         }}
         
         h3 {{
             font-size: calc(var(--base-font-size) + 5px);
             margin-top: 30px;
             margin-bottom: 18px;
-            color: {theme.text_color if not is_dark else theme.secondary_color};
+            color: {h3_color};
         }}
         
         /* 段落样式 */
@@ -349,14 +193,14 @@ class StyleManager:
         strong {{
             color: var(--primary-color);
             font-weight: 600;
-            background: linear-gradient(180deg, transparent 70%, {self.add_alpha(theme.primary_color, 0.2)} 70%);
+            background: linear-gradient(180deg, transparent 70%, {primary_a20} 70%);
             padding: 0 4px;
             border-radius: 2px;
         }}
         
         em {{
             font-style: italic;
-            color: {self.darken_color(theme.text_color, 0.2) if not is_dark else self.lighten_color(theme.text_color, 0.2)};
+            color: {em_color};
         }}
         
         /* 列表样式 */
@@ -388,10 +232,10 @@ class StyleManager:
             border-left: 4px solid var(--primary-color);
             margin: 28px 0;
             padding: 20px 28px;
-            background: {self.add_alpha(theme.primary_color, 0.05) if not is_dark else self.add_alpha(theme.primary_color, 0.1)};
+            background: {quote_bg};
             border-radius: 10px;
             position: relative;
-            box-shadow: 0 4px 15px {self.add_alpha(theme.primary_color, 0.1)};
+            box-shadow: 0 4px 15px {primary_a10};
         }}
         
         blockquote::before {{
@@ -400,13 +244,13 @@ class StyleManager:
             top: -10px;
             left: 24px;
             font-size: 48px;
-            color: {self.add_alpha(theme.primary_color, 0.3)};
+            color: {primary_a30};
             font-family: Georgia, serif;
             font-weight: bold;
         }}
         
         blockquote p {{
-            color: {self.darken_color(theme.text_color, 0.1) if not is_dark else self.lighten_color(theme.text_color, 0.1)};
+            color: {quote_text_color};
             font-style: italic;
             margin-bottom: 0;
             font-size: calc(var(--base-font-size) - 1px);
@@ -414,27 +258,27 @@ class StyleManager:
         
         /* 行内代码 */
         code {{
-            background: {self.add_alpha(theme.primary_color, 0.1)};
+            background: {primary_a10};
             padding: 4px 10px;
             border-radius: 6px;
             font-family: var(--code-font);
             font-size: calc(var(--base-font-size) - 2px);
-            color: {theme.primary_color if not is_dark else theme.accent_color};
+            color: {code_color};
             font-weight: 500;
-            border: 1px solid {self.add_alpha(theme.primary_color, 0.2)};
+            border: 1px solid {primary_a20};
         }}
         
         /* 代码块 */
         pre {{
-            background: {('#1e1e1e' if not is_dark else '#0a0a0f')};
+            background: {pre_bg};
             color: #d4d4d4;
             padding: 26px;
             border-radius: 12px;
             overflow-x: auto;
             margin: 28px 0;
-            box-shadow: 0 8px 24px {self.add_alpha('#000000', 0.15)};
+            box-shadow: 0 8px 24px rgba(0, 0, 0, 0.15);
             position: relative;
-            border: 1px solid {self.add_alpha(theme.primary_color, 0.2)};
+            border: 1px solid {primary_a20};
         }}
         
         pre::before {{
@@ -443,7 +287,7 @@ class StyleManager:
             top: 12px;
             right: 16px;
             font-size: 11px;
-            color: {self.add_alpha(theme.text_color, 0.5)};
+            color: {text_a50};
             font-weight: 600;
             letter-spacing: 1px;
             font-family: var(--font-family);
@@ -464,7 +308,7 @@ class StyleManager:
             border-collapse: collapse;
             margin: 28px 0;
             font-size: calc(var(--base-font-size) - 1px);
-            box-shadow: 0 4px 15px {self.add_alpha(theme.primary_color, 0.08)};
+            box-shadow: 0 4px 15px {primary_a08};
             border-radius: 10px;
             overflow: hidden;
         }}
@@ -481,16 +325,16 @@ class StyleManager:
         
         td {{
             padding: 15px 20px;
-            border-bottom: 1px solid {self.add_alpha(theme.text_color, 0.1)};
+            border-bottom: 1px solid {text_a10};
             color: var(--text-color);
         }}
         
         tr:nth-child(even) {{
-            background: {self.add_alpha(theme.primary_color, 0.03)};
+            background: {primary_a03};
         }}
         
         tr:hover {{
-            background: {self.add_alpha(theme.primary_color, 0.08)};
+            background: {primary_a08};
             transition: background 0.3s ease;
         }}
         
@@ -504,8 +348,8 @@ class StyleManager:
             height: 2px;
             background: linear-gradient(90deg, 
                 transparent, 
-                {self.add_alpha(theme.primary_color, 0.3)} 20%, 
-                {self.add_alpha(theme.primary_color, 0.3)} 80%, 
+                {primary_a30} 20%, 
+                {primary_a30} 80%, 
                 transparent);
             margin: 38px 0;
             position: relative;
@@ -517,7 +361,7 @@ class StyleManager:
             left: 50%;
             top: 50%;
             transform: translate(-50%, -50%);
-            background: {theme.background.split('(')[0] + '(180deg, #FFFFFF 0%, #FFFFFF 100%)' if 'gradient' in theme.background else '#FFFFFF'};
+            background: {hr_mark_bg};
             color: var(--primary-color);
             padding: 0 10px;
             font-size: 20px;
@@ -527,7 +371,7 @@ class StyleManager:
         a {{
             color: var(--link-color);
             text-decoration: none;
-            border-bottom: 2px solid {self.add_alpha(theme.link_color or theme.primary_color, 0.3)};
+            border-bottom: 2px solid {link_a30};
             transition: all 0.3s cubic-bezier(0.4, 0, 0.2, 1);
             padding-bottom: 1px;
             position: relative;
@@ -536,7 +380,7 @@ class StyleManager:
         a:hover {{
             color: var(--secondary-color);
             border-bottom-color: var(--secondary-color);
-            background: {self.add_alpha(theme.primary_color, 0.08)};
+            background: {primary_a08};
             padding: 2px 6px;
             margin: -2px -6px;
             border-radius: 4px;
@@ -571,7 +415,7 @@ class StyleManager:
         }}
         
         ::-webkit-scrollbar-track {{
-            background: {self.add_alpha(theme.text_color, 0.05)};
+            background: {text_a05};
             border-radius: 4px;
         }}
         
@@ -584,46 +428,374 @@ class StyleManager:
             background: linear-gradient(180deg, var(--secondary-color), var(--primary-color));
         }}
         """
+
+
+# CSS压缩：去注释、折叠空白、去掉分隔符两侧空白和块末分号。
+# 引号内的字符串（如 content 的值）原样保留，因此每个正则都先匹配字符串
+_CSS_STRING = r""""(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*'"""
+_CSS_COMMENT_RE = re.compile("(" + _CSS_STRING + r")|/\*.*?\*/", re.S)
+# 冒号前的空白不能去掉（"div :hover" 与 "div:hover" 含义不同）
+_CSS_SPACE_RE = re.compile("(" + _CSS_STRING + r")|\s*;?\s*(\})\s*|\s*([{;,>])\s*|(:)\s+|(\s+)")
+
+
+def _keep_css_comment_strings(match) -> str:
+    """注释替换为空，字符串原样返回"""
+    return match.group(1) or ""
+
+
+def _collapse_css_space(match) -> str:
+    """字符串原样返回，空白折叠为一个空格，分隔符两侧空白去掉"""
+    string, close, punct, colon, space = match.groups()
+    if string is not None:
+        return string
+    if space:
+        return " "
+    return close or punct or colon
+
+
+def _minify_css(css: str) -> str:
+    """压缩CSS文本"""
+    css = _CSS_COMMENT_RE.sub(_keep_css_comment_strings, css)
+    return _CSS_SPACE_RE.sub(_collapse_css_space, css).strip()
+
+
+class StyleManager:
+    """样式管理器 - 扩展版"""
+    
+    # 预设主题 - 12种风格
+    THEMES = {
+        # 社交媒体风格
+        "xiaohongshu": ThemeConfig(
+            name="小红书经典",
+            primary_color="#FF2442",
+            secondary_color="#FF6B6B",
+            text_color="#2c3e50",
+            background="linear-gradient(135deg, #ffeef8 0%, #ffe0f0 100%)",
+            font_family='-apple-system, BlinkMacSystemFont, "PingFang SC", "Helvetica Neue", "Microsoft YaHei", sans-serif',
+            heading_font='"PingFang SC", "Helvetica Neue", sans-serif',
+            code_font='"JetBrains Mono", "Cascadia Code", "Consolas", monospace',
+            accent_color="#FFB6C1",
+            link_color="#FF69B4"
+        ),
+        
+        "instagram": ThemeConfig(
+            name="Instagram渐变",
+            primary_color="#E4405F",
+            secondary_color="#BC2A8D",
+            text_color="#262626",
+            background="linear-gradient(45deg, #F9ED69 0%, #EE2A7B 50%, #6228D7 100%)",
+            font_family='-apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, Helvetica, Arial, sans-serif',
+            heading_font='"Segoe UI", Roboto, sans-serif',
+            code_font='"Monaco", "Courier New", monospace',
+            accent_color="#FCAF45",
+            link_color="#833AB4"
+        ),
+        
+        "wechat": ThemeConfig(
+            name="微信简约",
+            primary_color="#07C160",
+            secondary_color="#4CAF50",
+            text_color="#353535",
+            background="linear-gradient(180deg, #F7F7F7 0%, #FFFFFF 100%)",
+            font_family='"PingFang SC", "Hiragino Sans GB", "Microsoft YaHei", sans-serif',
+            heading_font='"PingFang SC", "Microsoft YaHei", sans-serif',
+            code_font='"SF Mono", "Monaco", "Inconsolata", monospace',
+            accent_color="#95EC69",
+            link_color="#576B95"
+        ),
+        
+        "douyin": ThemeConfig(
+            name="抖音酷黑",
+            primary_color="#FE2C55",
+            secondary_color="#25F4EE",
+            text_color="#FFFFFF",
+            background="linear-gradient(135deg, #000000 0%, #161823 100%)",
+            font_family='"PingFang SC", "Helvetica Neue", Arial, sans-serif',
+            heading_font='"PingFang SC", "Helvetica Neue", sans-serif',
+            code_font='"Fira Code", "Source Code Pro", monospace',
+            accent_color="#00F2EA",
+            link_color="#FE2C55"
+        ),
+        
+        # 知识平台风格
+        "zhihu": ThemeConfig(
+            name="知乎蓝",
+            primary_color="#0084FF",
+            secondary_color="#1890FF",
+            text_color="#1A1A1A",
+            background="linear-gradient(180deg, #FFFFFF 0%, #F6F6F6 100%)",
+            font_family='"PingFang SC", "Helvetica Neue", "Microsoft YaHei", sans-serif',
+            heading_font='"PingFang SC", "Helvetica Neue", sans-serif',
+            code_font='"Source Code Pro", "Consolas", monospace',
+            accent_color="#5BBCFF",
+            link_color="#175199"
+        ),
+        
+        "notion": ThemeConfig(
+            name="Notion极简",
+            primary_color="#000000",
+            secondary_color="#2F3437",
+            text_color="#37352F",
+            background="linear-gradient(180deg, #FFFFFF 0%, #FAFAFA 100%)",
+            font_family='"Inter", -apple-system, BlinkMacSystemFont, "Segoe UI", sans-serif',
+            heading_font='"Inter", -apple-system, sans-serif',
+            code_font='"SFMono-Regular", "Consolas", "Liberation Mono", monospace',
+            accent_color="#EB5757",
+            link_color="#0070F3"
+        ),
+        
+        # 优雅风格
+        "elegant_purple": ThemeConfig(
+            name="优雅紫",
+            primary_color="#6B46C1",
+            secondary_color="#9333EA",
+            text_color="#1F2937",
+            background="linear-gradient(135deg, #F9FAFB 0%, #F3E8FF 100%)",
+            font_family='"Inter", "PingFang SC", "Microsoft YaHei", sans-serif',
+            heading_font='"Playfair Display", "PingFang SC", serif',
+            code_font='"JetBrains Mono", "Cascadia Code", monospace',
+            accent_color="#A78BFA",
+            link_color="#7C3AED"
+        ),
+        
+        "ocean_blue": ThemeConfig(
+            name="海洋蓝",
+            primary_color="#0EA5E9",
+            secondary_color="#06B6D4",
+            text_color="#0F172A",
+            background="linear-gradient(135deg, #F0F9FF 0%, #E0F2FE 50%, #BAE6FD 100%)",
+            font_family='"Inter", "PingFang SC", "Microsoft YaHei", sans-serif',
+            heading_font='"Inter", "PingFang SC", sans-serif',
+            code_font='"Fira Code", "Consolas", monospace',
+            accent_color="#38BDF8",
+            link_color="#0284C7"
+        ),
+        
+        "sunset_orange": ThemeConfig(
+            name="日落橙",
+            primary_color="#F97316",
+            secondary_color="#FB923C",
+            text_color="#1C1917",
+            background="linear-gradient(135deg, #FFF7ED 0%, #FED7AA 50%, #FDBA74 100%)",
+            font_family='"Inter", "PingFang SC", "Microsoft YaHei", sans-serif',
+            heading_font='"Inter", "PingFang SC", sans-serif',
+            code_font='"Source Code Pro", "Monaco", monospace',
+            accent_color="#FCD34D",
+            link_color="#EA580C"
+        ),
+        
+        "forest_green": ThemeConfig(
+            name="森林绿",
+            primary_color="#059669",
+            secondary_color="#10B981",
+            text_color="#064E3B",
+            background="linear-gradient(135deg, #ECFDF5 0%, #D1FAE5 50%, #A7F3D0 100%)",
+            font_family='"Inter", "PingFang SC", "Microsoft YaHei", sans-serif',
+            heading_font='"Inter", "PingFang SC", sans-serif',
+            code_font='"JetBrains Mono", monospace',
+            accent_color="#34D399",
+            link_color="#047857"
+        ),
+        
+        # 深色主题
+        "dark_mode": ThemeConfig(
+            name="深色模式",
+            primary_color="#00E0FF",
+            secondary_color="#0096FF",
+            text_color="#E0E6ED",
+            background="linear-gradient(135deg, #0F0F1E 0%, #1A1A2E 50%, #16213E 100%)",
+            font_family='"Inter", "PingFang SC", "Microsoft YaHei", sans-serif',
+            heading_font='"Inter", "PingFang SC", sans-serif',
+            code_font='"Fira Code", "JetBrains Mono", monospace',
+            accent_color="#00F0FF",
+            link_color="#00B8D4"
+        ),
+        
+        "midnight": ThemeConfig(
+            name="午夜紫",
+            primary_color="#B794F4",
+            secondary_color="#9F7AEA",
+            text_color="#E9D8FD",
+            background="linear-gradient(135deg, #1A202C 0%, #2D3748 50%, #4A5568 100%)",
+            font_family='"Inter", "PingFang SC", "Microsoft YaHei", sans-serif',
+            heading_font='"Inter", "PingFang SC", sans-serif',
+            code_font='"Cascadia Code", "Fira Code", monospace',
+            accent_color="#D6BCFA",
+            link_color="#B794F4"
+        )
+    }
+    # 预设主题只读；键做驻留，查找时可直接按指针比较
+    THEMES = MappingProxyType({sys.intern(key): theme for key, theme in THEMES.items()})
+    DEFAULT_THEME = THEMES["xiaohongshu"]
+    
+    # 深色主题（部分文字颜色需要反向处理）
+    DARK_THEMES = frozenset({"dark_mode", "midnight", "douyin"})
+    
+    # 主题CSS缓存（所有实例共享），键为 (主题键, 是否深色, 字号, 是否保留格式)
+    _css_cache: Dict[Tuple[str, bool, int, bool], str] = {}
+    
+    # 导出设置缓存（所有实例共享），键为主题配置
+    _export_cache: Dict[ThemeConfig, Mapping[str, Any]] = {}
+    
+    def __init__(self, theme: str = "xiaohongshu"):
+        self.current_theme = sys.intern(theme)
+        self.custom_styles = {}
+        # 组合CSS缓存，键中包含自定义样式快照
+        self._combined_cache: Dict[Tuple, str] = {}
+        # 绑定主题查找方法，get_theme 热路径上省去属性查找
+        self._lookup_theme = self.THEMES.get
+        
+    def get_theme(self, theme_name: str = None) -> ThemeConfig:
+        """获取主题配置"""
+        if theme_name is None:
+            theme_name = self.current_theme
+        return self._lookup_theme(theme_name, self.DEFAULT_THEME)
+    
+    def get_theme_list(self) -> list:
+        """获取所有主题列表"""
+        return list(self.THEMES.keys())
+    
+    def get_theme_display_names(self) -> Dict[str, str]:
+        """获取主题显示名称"""
+        return {key: theme.name for key, theme in self.THEMES.items()}
+    
+    def set_theme(self, theme_name: str):
+        """设置当前主题"""
+        if theme_name in self.THEMES:
+            self.current_theme = sys.intern(theme_name)
+    
+    def hex_to_rgb(self, hex_color: str) -> Tuple[int, int, int]:
+        """十六进制颜色转RGB"""
+        return _hex_to_rgb(hex_color)
+    
+    def rgb_to_hex(self, r: int, g: int, b: int) -> str:
+        """RGB转十六进制"""
+        return f"#{r:02x}{g:02x}{b:02x}"
+    
+    def lighten_color(self, hex_color: str, amount: float) -> str:
+        """使颜色变浅（amount: 0-1）"""
+        return _lighten(hex_color, amount)
+    
+    def darken_color(self, hex_color: str, amount: float) -> str:
+        """使颜色变深（amount: 0-1）"""
+        return _darken(hex_color, amount)
+    
+    def add_alpha(self, hex_color: str, alpha: float) -> str:
+        """添加透明度（返回rgba格式）"""
+        return _add_alpha(hex_color, alpha)
+    
+    def _css_key(self, theme_name: str, font_size: int) -> Tuple[str, bool, int]:
+        """计算主题CSS的缓存键"""
+        name = self.current_theme if theme_name is None else theme_name
+        if name not in self.THEMES:
+            name = "xiaohongshu"
+        # 深色判断沿用传入的主题名（未指定时按浅色处理）
+        return (name, theme_name in self.DARK_THEMES, font_size)
+    
+    def generate_css(self, theme_name: str = None, font_size: int = 18,
+                     pretty: bool = False) -> str:
+        """
+        生成主题CSS（主题配置不可变，按主题和字号缓存）
+        
+        默认返回压缩后的CSS，pretty=True 时返回带缩进和注释的原始格式
+        """
+        key = self._css_key(theme_name, font_size) + (pretty,)
+        css = self._css_cache.get(key)
+        if css is None:
+            css = self._render_css(self.THEMES[key[0]], key[1], font_size)
+            if not pretty:
+                css = _minify_css(css)
+            self._css_cache[key] = css
+        return css
     
-    def get_export_settings(self, theme_name: str = None) -> Dict[str, Any]:
-        """获取导出设置"""
-        theme = self.get_theme(theme_name)
+    def _render_css(self, theme: ThemeConfig, is_dark: bool, font_size: int) -> str:
+        """渲染主题CSS（派生颜色已在 ThemeConfig 中预先计算）"""
+        primary = theme.primary_color
+        link = theme.link_color or primary
+        values = asdict(theme)
+        values.update(
+            font_size=font_size,
+            accent=theme.accent_color or theme.secondary_color,
+            link=link,
+            link_a30=_add_alpha(link, 0.3),
+            primary_a03=_add_alpha(primary, 0.03),
+            primary_a08=_add_alpha(primary, 0.08),
+            primary_a10=_add_alpha(primary, 0.1),
+            primary_a20=_add_alpha(primary, 0.2),
+            primary_a30=_add_alpha(primary, 0.3),
+            text_a05=_add_alpha(theme.text_color, 0.05),
+            text_a10=_add_alpha(theme.text_color, 0.1),
+            text_a50=_add_alpha(theme.text_color, 0.5),
+            # 深色主题的差异化配色
+            h3_color=theme.text_color if not is_dark else theme.secondary_color,
+            em_color=theme.text_darker if not is_dark else theme.text_lighter,
+            quote_bg=_add_alpha(primary, 0.05) if not is_dark else _add_alpha(primary, 0.1),
+            quote_text_color=theme.text_dark if not is_dark else theme.text_light,
+            code_color=primary if not is_dark else theme.accent_color,
+            pre_bg='#1e1e1e' if not is_dark else '#0a0a0f',
+            # 分隔线装饰符的背景：渐变背景改为白色渐变
+            hr_mark_bg=(theme.background.split('(')[0] + '(180deg, #FFFFFF 0%, #FFFFFF 100%)'
+                        if 'gradient' in theme.background else '#FFFFFF'),
+        )
+        return _CSS_TEMPLATE.format_map(values)
+    
+    def get_export_settings(self, theme_name: str = None, copy: bool = False) -> Mapping[str, Any]:
+        """
+        获取导出设置
         
-        return {
-            "theme_name": theme.name,
-            "page_width": 1080,
-            "page_height": 1440,
-            "padding": {
-                "top": 45,
-                "bottom": 45,
-                "left": 40,
-                "right": 40
-            },
-            "font_size": 16,
-            "line_height": 1.8,
-            "paragraph_spacing": 20,
-            "image_quality": 100,
-            "format": "PNG",
-            "colors": {
-                "primary": theme.primary_color,
-                "secondary": theme.secondary_color,
-                "text": theme.text_color,
-                "background": theme.background
-            }
-        }
+        默认返回按主题共享的只读视图；需要修改时传入 copy=True 获取独立副本
+        """
+        theme = self.get_theme(theme_name)
+        settings = self._export_cache.get(theme)
+        if settings is None:
+            settings = MappingProxyType({
+                "theme_name": theme.name,
+                "page_width": 1080,
+                "page_height": 1440,
+                "padding": MappingProxyType({
+                    "top": 45,
+                    "bottom": 45,
+                    "left": 40,
+                    "right": 40
+                }),
+                "font_size": 16,
+                "line_height": 1.8,
+                "paragraph_spacing": 20,
+                "image_quality": 100,
+                "format": "PNG",
+                "colors": MappingProxyType({
+                    "primary": theme.primary_color,
+                    "secondary": theme.secondary_color,
+                    "text": theme.text_color,
+                    "background": theme.background
+                })
+            })
+            self._export_cache[theme] = settings
+        
+        if copy:
+            return {key: dict(value) if isinstance(value, MappingProxyType) else value
+                    for key, value in settings.items()}
+        return settings
     
     def apply_custom_styles(self, styles: Dict[str, str]):
         """应用自定义样式"""
         self.custom_styles.update(styles)
     
-    def get_combined_css(self, theme_name: str = None, font_size: int = 18) -> str:
+    def get_combined_css(self, theme_name: str = None, font_size: int = 18,
+                         pretty: bool = False) -> str:
         """获取组合的CSS（主题 + 自定义）"""
-        base_css = self.generate_css(theme_name, font_size)
-        
-        if self.custom_styles:
-            custom_css = "\n/* 自定义样式 */\n"
-            for selector, rules in self.custom_styles.items():
-                custom_css += f"{selector} {{\n{rules}\n}}\n"
-            return base_css + custom_css
-        
-        return base_css
\ No newline at end of file
+        if not self.custom_styles:
+            return self.generate_css(theme_name, font_size, pretty)
+        
+        key = (self._css_key(theme_name, font_size), pretty, tuple(self.custom_styles.items()))
+        css = self._combined_cache.get(key)
+        if css is None:
+            base_css = self.generate_css(theme_name, font_size, pretty)
+            parts = ["\n/* 自定义样式 */\n"]
+            parts.extend(f"{selector} {{\n{rules}\n}}\n" for selector, rules in self.custom_styles.items())
+            custom_css = "".join(parts)
+            if not pretty:
+                custom_css = _minify_css(custom_css)
+            css = base_css + custom_css
+            self._combined_cache[key] = css
+        return css
\ No newline at end of file
@@ -0,0 +1,58 @@
+# ============================================
+# tests/test_paginator.py
+# ============================================
+import re
+import unittest
+
+from src.core.markdown_processor import MarkdownProcessor
+from src.utils.paginator import SmartPaginator
+
+_STYLE_RE = re.compile(r'\s*<style>.*?</style>\s*', re.DOTALL)
+
+
+def _task_list_document() -> str:
+    """含任务列表和图片的长文档（会被分成多页）"""
+    parts = ['# 任务清单', '![封面](cover.png)']
+    for i in range(12):
+        parts.append(f'## 第 {i + 1} 节')
+        parts.append('- [x] 已完成的任务\n- [ ] 未完成的任务\n- [ ] 另一项任务')
+        parts.append('这是一段用于撑开页面高度的正文内容，' * 12)
+        if i % 4 == 0:
+            parts.append(f'![配图](pic{i}.png)')
+    return '\n\n'.join(parts)
+
+
+class TaskListPaginationTest(unittest.TestCase):
+    """任务列表样式块不应影响分页结果"""
+
+    def test_style_block_does_not_shift_page_breaks(self):
+        html = MarkdownProcessor().parse(_task_list_document())
+        self.assertIn('<style>', html)
+        without_style = _STYLE_RE.sub('', html)
+
+        for size in SmartPaginator.PAGE_SIZES:
+            with self.subTest(size=size):
+                pages = SmartPaginator(size).paginate(html)
+                expected = SmartPaginator(size).paginate(without_style)
+                self.assertGreater(len(expected), 1)
+                self.assertEqual(len(pages), len(expected))
+                self.assertEqual([_STYLE_RE.sub('', page).strip() for page in pages],
+                                 [page.strip() for page in expected])
+                # 样式块仍保留在页面中
+                self.assertIn('<style>', pages[0])
+
+
+class PagebreakParagraphTest(unittest.TestCase):
+    """段落内的分页标记切分后，各段保留原段落的属性"""
+
+    def test_split_keeps_paragraph_attributes(self):
+        html = '<p class="x">a<span class="pagebreak-marker"></span>b</p>'
+        elements = SmartPaginator().parse_html_to_elements(html)
+
+        self.assertEqual([e.type for e in elements], ['paragraph', 'pagebreak', 'paragraph'])
+        self.assertEqual(elements[0].content, '<p class="x">a</p>')
+        self.assertEqual(elements[2].content, '<p class="x">b</p>')
+
+
+if __name__ == '__main__':
+    unittest.main()